@@ -0,0 +1,73 @@
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.events import run_events
+from src.modules import ModuleLoader, link
+from src.render import SAMPLE_RATE, build_timeline, deduplicate, render
+
+
+PHRASE = [
+    "play(E4, beat);",
+    "play(G4, beat);",
+    "play(A4, beat * 2);",
+    "rest(beat);",
+    "play(B4, beat);",
+    "play(A4, beat);",
+]
+
+
+def repeated_score(repeats, variations):
+    lines = ["int beat = 150;"]
+    for variation in range(variations):
+        lines.append(f"repeat({repeats}) {{")
+        lines.extend(f"    {statement}" for statement in PHRASE)
+        lines.append(f"    play(C5, beat + {variation * 10});")
+        lines.append("}")
+    return "\n".join(lines)
+
+
+def load_timeline(source, unroll_budget):
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "score.ms"
+        path.write_text(source, encoding="utf-8")
+        code = link(ModuleLoader(False, unroll_budget).load(path))
+    return build_timeline(run_events(code))
+
+
+def best_time(timeline, workers, memoize, rounds):
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        render(timeline, workers, memoize)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, nargs="+", default=[8, 32, 128])
+    parser.add_argument("--variations", type=int, default=4)
+    parser.add_argument("--unroll-budget", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'repeats':>8} {'audio (s)':>10} {'notes':>7} {'unique':>7} "
+          f"{'plain (s)':>10} {'memo (s)':>9} {'speedup':>8}")
+    for repeats in args.repeats:
+        timeline = load_timeline(repeated_score(repeats, args.variations), args.unroll_budget)
+        unique, _ = deduplicate(timeline)
+        plain = best_time(timeline, args.workers, False, args.rounds)
+        memo = best_time(timeline, args.workers, True, args.rounds)
+        print(f"{repeats:>8} {timeline.total / SAMPLE_RATE:>10.1f} {len(timeline.starts):>7} "
+              f"{len(unique.starts):>7} {plain:>10.3f} {memo:>9.3f} {plain / memo:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
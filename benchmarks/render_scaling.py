@@ -0,0 +1,49 @@
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.events import run_events
+from src.modules import ModuleLoader, link
+from src.render import SAMPLE_RATE, build_timeline, render
+
+
+def load_events(source_path, copies):
+    code = link(ModuleLoader(use_cache=False).load(source_path))
+    return list(run_events(code)) * copies
+
+
+def best_time(timeline, workers, rounds):
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        render(timeline, workers)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("source", nargs="?", default="examples/potc.ms")
+    parser.add_argument("--copies", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    timeline = build_timeline(load_events(args.source, args.copies))
+    seconds = timeline.total / SAMPLE_RATE
+    print(f"{len(timeline.starts)} notes, {seconds:.1f}s of audio, {os.cpu_count()} cpus")
+    print(f"{'workers':>8} {'time (s)':>10} {'speedup':>8} {'x realtime':>11}")
+    baseline = None
+    for workers in args.workers:
+        elapsed = best_time(timeline, workers, args.rounds)
+        baseline = baseline or elapsed
+        print(f"{workers:>8} {elapsed:>10.3f} {baseline / elapsed:>8.2f} {seconds / elapsed:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
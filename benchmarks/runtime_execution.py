@@ -0,0 +1,195 @@
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import types
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.analysis import analyze_resources
+from src.bytecode import cache_key, compile_module, load_cache, write_cache
+from src.codegen import generate, generate_stream
+from src.limits import ResourceLimits
+from src.modules import ModuleLoader, link, stream_program
+
+
+ROOT = Path(__file__).resolve().parent.parent
+MODES = ["python", "stream", "bytecode", "profile", "limits"]
+COUNTING_LIMITS = ResourceLimits(max_instructions=10 ** 15)
+
+
+class HeadlessAudio:
+
+    def __init__(self):
+        self.namespace = None
+        self.start = 0.0
+        self.init_time = 0.0
+        self.quit_time = 0.0
+        self.synth_time = 0.0
+        self.samples = 0
+        self.notes = 0
+
+    def reset(self, namespace):
+        self.__init__()
+        self.namespace = namespace
+        self.start = time.perf_counter()
+
+    def init(self):
+        generate_tone = self.namespace["generate_tone"]
+
+        def timed_generate_tone(freq, duration_ms):
+            start = time.perf_counter()
+            tone = generate_tone(freq, duration_ms)
+            self.synth_time += time.perf_counter() - start
+            self.samples += len(tone)
+            self.notes += 1
+            return tone
+
+        self.namespace["generate_tone"] = timed_generate_tone
+        self.init_time = time.perf_counter()
+
+    def quit(self):
+        self.quit_time = time.perf_counter()
+
+    def module(self):
+        pygame = types.ModuleType("pygame")
+        pygame.init = self.init
+        pygame.quit = self.quit
+        pygame.mixer = types.SimpleNamespace(pre_init=lambda *args, **kwargs: None)
+        sound = types.SimpleNamespace(play=lambda: None)
+        pygame.sndarray = types.SimpleNamespace(make_sound=lambda array: sound)
+        pygame.time = types.SimpleNamespace(wait=lambda ms: None)
+        return pygame
+
+
+def corpus_source(sources, scale):
+    blocks = []
+    for path in sources:
+        body = path.read_text(encoding="utf-8")
+        blocks.append(f"// {path.name}\nrepeat({scale}) {{\n{body}\n}}")
+    return "\n\n".join(blocks)
+
+
+def load_program(path):
+    loader = ModuleLoader(use_cache=False)
+    code = link(loader.load(path))
+    return loader, code
+
+
+def build(mode, source_path, directory):
+    output = Path(directory) / f"{mode}.py"
+    if mode == "stream":
+        generate_stream(stream_program(source_path, ModuleLoader(use_cache=False)), output)
+        return output
+    loader, code = load_program(source_path)
+    max_note_samples = analyze_resources(code).max_note_samples or 0
+    if mode == "bytecode":
+        output = output.with_suffix(".msc")
+        key = cache_key(*loader.digests())
+        write_cache(output, key, compile_module(code, str(output), None, max_note_samples))
+        return output, key
+    limits = COUNTING_LIMITS if mode == "limits" else None
+    generate(code, output, mode == "profile", max_note_samples, limits)
+    return output
+
+
+def count_instructions(source_path, directory, audio, stream=False):
+    output = Path(directory) / ("count_stream.py" if stream else "count.py")
+    if stream:
+        chunks = stream_program(source_path, ModuleLoader(use_cache=False))
+        generate_stream(chunks, output, limits=COUNTING_LIMITS)
+    else:
+        _, code = load_program(source_path)
+        generate(code, output, limits=COUNTING_LIMITS)
+    namespace = run_artifact(output, audio)
+    return COUNTING_LIMITS.max_instructions - namespace["fuel"]
+
+
+def load_code(artifact):
+    if isinstance(artifact, tuple):
+        path, key = artifact
+        return load_cache(path, key)
+    path = Path(artifact)
+    return compile(path.read_text(encoding="utf-8"), str(path), "exec")
+
+
+def run_artifact(artifact, audio):
+    namespace = {"__name__": "__main__"}
+    audio.reset(namespace)
+    exec(load_code(artifact), namespace)
+    return namespace
+
+
+def measure(artifact, executed, audio, rounds):
+    best = None
+    for _ in range(rounds):
+        run_artifact(artifact, audio)
+        startup = audio.init_time - audio.start
+        execution = audio.quit_time - audio.init_time
+        dispatch = max(execution - audio.synth_time, 1e-9)
+        result = {
+            "startup_seconds": startup,
+            "execution_seconds": execution,
+            "synthesis_seconds": audio.synth_time,
+            "instructions": executed,
+            "instructions_per_second": executed / dispatch,
+            "notes": audio.notes,
+            "samples": audio.samples,
+            "samples_per_second": audio.samples / audio.synth_time if audio.synth_time else 0.0,
+        }
+        if best is None or execution < best["execution_seconds"]:
+            best = result
+    return best
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("sources", nargs="*", type=Path)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--output", type=Path, default=Path("runtime_results.json"))
+    args = parser.parse_args()
+
+    sources = args.sources or sorted((ROOT / "examples").glob("*.ms"))
+    audio = HeadlessAudio()
+    sys.modules["pygame"] = audio.module()
+    results = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "sources": [path.name for path in sources],
+        "runs": [],
+    }
+    print(f"{'scale':>6} {'mode':>9} {'startup (ms)':>13} {'exec (s)':>9} {'instr/s':>11} {'samples/s':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for scale in args.scales:
+            source_path = Path(directory) / f"corpus_{scale}.ms"
+            source_path.write_text(corpus_source(sources, scale), encoding="utf-8")
+            executed = count_instructions(source_path, directory, audio)
+            streamed = count_instructions(source_path, directory, audio, stream=True)
+            for mode in args.modes:
+                artifact = build(mode, source_path, directory)
+                result = measure(artifact, streamed if mode == "stream" else executed, audio, args.rounds)
+                results["runs"].append({"scale": scale, "mode": mode, **result})
+                print(f"{scale:>6} {mode:>9} {result['startup_seconds'] * 1000:>13.2f} "
+                      f"{result['execution_seconds']:>9.3f} {result['instructions_per_second']:>11.0f} "
+                      f"{result['samples_per_second']:>12.0f}")
+    args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.errors import CompilerError
+from src.lexer import tokenize
+from src.parser import Parser
+from src.semantic import SemanticAnalyzer, SymbolTable
+
+
+class ScopeStackTable:
+
+    def __init__(self):
+        self.scopes = [{}]
+
+    def push_scope(self):
+        self.scopes.append({})
+
+    def pop_scope(self):
+        if len(self.scopes) > 1:
+            self.scopes.pop()
+
+    def declare(self, name, type_name):
+        current_scope = self.scopes[-1]
+        if name in current_scope:
+            raise CompilerError(0, f"Variable '{name}' already declared in this scope")
+        current_scope[name] = type_name
+
+    def lookup(self, name):
+        for scope in reversed(self.scopes):
+            if name in scope:
+                return scope[name]
+        raise CompilerError(0, f"Variable '{name}' not declared")
+
+    def is_declared(self, name):
+        for scope in reversed(self.scopes):
+            if name in scope:
+                return True
+        return False
+
+    def global_names(self):
+        return dict(self.scopes[0])
+
+
+def nested_program(depth, variables, uses):
+    lines = [f"int g{i} = {i};" for i in range(variables)]
+    for level in range(depth):
+        lines.append("repeat(1) {")
+        lines.extend(f"int v{level}_{i} = g{i} + 1;" for i in range(variables))
+    innermost = " + ".join(f"g{i % variables}" for i in range(uses))
+    lines.append(f"int total = {innermost};")
+    lines.append("play(C4, total);")
+    lines.extend("}" for _ in range(depth))
+    return "\n".join(lines)
+
+
+def best_time(program, table_class, rounds):
+    best = None
+    for _ in range(rounds):
+        analyzer = SemanticAnalyzer()
+        analyzer.symbol_table = table_class()
+        start = time.perf_counter()
+        analyzer.analyze(program)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--depths", type=int, nargs="+", default=[10, 50, 200, 500])
+    parser.add_argument("--variables", type=int, default=20)
+    parser.add_argument("--uses", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10 * max(args.depths) + 1000))
+    print(f"{'depth':>6} {'scope stack (ms)':>17} {'flat (ms)':>10} {'speedup':>8}")
+    for depth in args.depths:
+        source = nested_program(depth, args.variables, args.uses)
+        program = Parser(tokenize(source)).parse_program()
+        stack = best_time(program, ScopeStackTable, args.rounds)
+        flat = best_time(program, SymbolTable, args.rounds)
+        print(f"{depth:>6} {stack * 1000:>17.2f} {flat * 1000:>10.2f} {stack / flat:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
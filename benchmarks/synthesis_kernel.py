@@ -0,0 +1,91 @@
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.codegen import TONE_KERNEL
+
+
+def legacy_generate_tone(freq, duration_ms):
+    sample_rate = 44100
+    n_samples = int(sample_rate * (duration_ms / 1000.0))
+    t = np.linspace(0, duration_ms / 1000.0, n_samples, False)
+    wave = np.sin(2 * np.pi * freq * t) * 4096
+    wave = wave.astype(np.int16)
+    return np.column_stack((wave, wave))
+
+
+def kernel_generate_tone(max_note_samples):
+    namespace = {"np": np}
+    exec(TONE_KERNEL, namespace)
+    namespace["reserve_tone_buffers"](max_note_samples)
+    return namespace["generate_tone"]
+
+
+def note_sequence(count, duration):
+    freqs = [262, 294, 330, 349, 392, 440, 494, 523]
+    return [(freqs[index % len(freqs)], duration) for index in range(count)]
+
+
+def notes_per_second(function, notes, rounds):
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for freq, duration in notes:
+            function(freq, duration)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(notes) / best
+
+
+def peak_allocation(function, notes):
+    function(*notes[0])
+    tracemalloc.start()
+    try:
+        peak = 0
+        for freq, duration in notes:
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            function(freq, duration)
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def max_difference(notes, kernel):
+    worst = 0
+    for freq, duration in notes:
+        expected = legacy_generate_tone(freq, duration).astype(np.int32)
+        worst = max(worst, int(np.abs(expected - kernel(freq, duration)).max(initial=0)))
+    return worst
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--notes", type=int, default=2000)
+    parser.add_argument("--durations", type=int, nargs="+", default=[100, 250, 500, 2000])
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'dur (ms)':>9} {'legacy notes/s':>15} {'kernel notes/s':>15} {'speedup':>8} "
+          f"{'legacy peak KiB':>16} {'kernel peak KiB':>16} {'max diff':>9}")
+    for duration in args.durations:
+        notes = note_sequence(args.notes, duration)
+        kernel = kernel_generate_tone(int(44100 * duration / 1000))
+        legacy_rate = notes_per_second(legacy_generate_tone, notes, args.rounds)
+        kernel_rate = notes_per_second(kernel, notes, args.rounds)
+        legacy_peak = peak_allocation(legacy_generate_tone, notes[:50])
+        kernel_peak = peak_allocation(kernel, notes[:50])
+        diff = max_difference(notes[:50], kernel)
+        print(f"{duration:>9} {legacy_rate:>15.0f} {kernel_rate:>15.0f} {kernel_rate / legacy_rate:>8.2f} "
+              f"{legacy_peak / 1024:>16.1f} {kernel_peak / 1024:>16.1f} {diff:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,110 @@
 import argparse
 import os
 import sys
-from pathlib import Path
+from dataclasses import dataclass, field
 
-from src.codegen import generate
+from src.analysis import analyze_resources, format_stats
+from src.bytecode import cache_key, cache_path, compile_module, load_cache, run_code, write_cache
+from src.codegen import generate, generate_stream, profile_path_for
 from src.errors import CompilerError
-from src.icg import ICGenerator
-from src.lexer import tokenize
-from src.optimizer import optimize
-from src.parser import Parser
-from src.semantic import SemanticAnalyzer
+from src.limits import ResourceLimits, limit_chunks
+from src.midi import generate_midi
+from src.modules import ModuleLoader, link, stream_program
+from src.unroll import DEFAULT_BUDGET
 
 
-def read_source(path):
-    try:
-        return Path(path).read_text(encoding="utf-8")
-    except FileNotFoundError:
-        raise CompilerError(0, f"File not found: {path}")
-
-
-def run_pipeline(source_path, output_path, run_flag):
-    source = read_source(source_path)
-    tokens = tokenize(source)
-    parser = Parser(tokens)
-    program = parser.parse_program()
-    analyzer = SemanticAnalyzer()
-    analyzer.analyze(program)
-    icg = ICGenerator()
-    code = icg.generate(program)
-    optimized = optimize(code)
-    generate(optimized, output_path)
+default_outputs = {
+    "python": "output.py",
+    "midi": "output.mid",
+    "wav": "output.wav",
+}
+
+
+@dataclass
+class PipelineOptions:
+    backend: str = "python"
+    use_cache: bool = True
+    workers: int = 1
+    unroll_budget: int = DEFAULT_BUDGET
+    stream: bool = False
+    profile: bool = False
+    show_stats: bool = False
+    limits: ResourceLimits = field(default_factory=ResourceLimits)
+
+
+def compile_program(loader, source_path, limits):
+    with limits.phase("Compilation"):
+        unit = loader.load(source_path)
+        code = link(unit)
+    limits.check_quadruples(len(code))
+    return unit, code
+
+
+def analyze(code, options):
+    limits = options.limits
+    with limits.phase("Analysis"):
+        stats = analyze_resources(code)
+    if options.show_stats:
+        print(format_stats(stats))
+    limits.check_instructions(stats.instructions)
+    limits.check_duration(stats.duration_ms)
+    return stats
+
+
+def run_bytecode(source_path, run_flag, options):
+    loader = ModuleLoader(options.use_cache, options.unroll_budget)
+    limits = options.limits
+    unit, code = compile_program(loader, source_path, limits)
+    path = cache_path(source_path)
+    profile_path = profile_path_for(path) if options.profile else None
+    key = cache_key(profile_path, limits, *loader.digests())
+    code_object = load_cache(path, key) if options.use_cache else None
+    if code_object is None:
+        stats = analyze(code, options)
+        with limits.phase("Code generation"):
+            code_object = compile_module(code, str(path), profile_path, stats.max_note_samples or 0, limits)
+        if options.use_cache:
+            write_cache(path, key, code_object)
+    elif options.show_stats or limits.max_duration is not None or limits.max_instructions is not None:
+        analyze(code, options)
+    if run_flag:
+        run_code(code_object)
+
+
+def run_pipeline(source_path, output_path, run_flag, options=None):
+    options = options or PipelineOptions()
+    limits = options.limits
+    loader = ModuleLoader(options.use_cache, options.unroll_budget)
+    if options.stream:
+        if options.backend != "python":
+            raise CompilerError(0, "Streaming compilation requires the python backend")
+        if options.show_stats:
+            raise CompilerError(0, "Resource analysis is not available in streaming mode")
+        with limits.phase("Compilation") as budget:
+            chunks = limit_chunks(stream_program(source_path, loader), limits, budget)
+            generate_stream(chunks, output_path, options.profile, limits)
+        if run_flag:
+            os.system(f"python {output_path}")
+        return
+    if options.backend == "bytecode":
+        run_bytecode(source_path, run_flag, options)
+        return
+    _, optimized = compile_program(loader, source_path, limits)
+    stats = analyze(optimized, options)
+    if options.backend == "midi":
+        with limits.phase("MIDI generation") as budget:
+            generate_midi(optimized, output_path, limits.max_instructions, budget, limits.max_audio_ms)
+        return
+    if options.backend == "wav":
+        from src.render import generate_wav
+        with limits.phase("Rendering") as budget:
+            generate_wav(
+                optimized, output_path, options.workers, stats.sounds, limits.max_instructions, budget,
+                limits.max_audio_ms,
+            )
+        return
+    with limits.phase("Code generation"):
+        generate(optimized, output_path, options.profile, stats.max_note_samples or 0, limits)
     if run_flag:
         os.system(f"python {output_path}")
 
@@ -37,10 +112,37 @@ def run_pipeline(source_path, output_path, run_flag):
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("source", nargs="?", default="input.ms")
-    parser.add_argument("--output", default="output.py")
+    parser.add_argument("--output")
     parser.add_argument("--run", action="store_true")
+    parser.add_argument("--backend", choices=["python", "bytecode", "midi", "wav"], default="python")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--unroll-budget", type=int, default=DEFAULT_BUDGET)
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--profile", action="store_true")
+    parser.add_argument("--stats", action="store_true")
+    parser.add_argument("--max-duration", type=float)
+    parser.add_argument("--max-instructions", type=int)
+    parser.add_argument("--max-quadruples", type=int)
+    parser.add_argument("--phase-timeout", type=float)
     args = parser.parse_args()
-    run_pipeline(args.source, args.output, args.run)
+    output = args.output or default_outputs.get(args.backend)
+    options = PipelineOptions(
+        backend=args.backend,
+        use_cache=not args.no_cache,
+        workers=args.workers,
+        unroll_budget=args.unroll_budget,
+        stream=args.stream,
+        profile=args.profile,
+        show_stats=args.stats,
+        limits=ResourceLimits(
+            max_instructions=args.max_instructions,
+            max_duration=args.max_duration,
+            max_quadruples=args.max_quadruples,
+            phase_seconds=args.phase_timeout,
+        ),
+    )
+    run_pipeline(args.source, output, args.run, options)
 
 
 if __name__ == "__main__":
@@ -49,4 +151,3 @@ if __name__ == "__main__":
     except CompilerError as err:
         print(err)
         sys.exit(1)
-
@@ -0,0 +1,311 @@
+from dataclasses import dataclass, fields
+from typing import Optional
+
+from src.optimizer import conditional_positions, is_int_literal, to_int
+
+
+SAMPLE_RATE = 44100
+
+
+@dataclass
+class ResourceStats:
+    duration_ms: Optional[int] = None
+    samples: Optional[int] = None
+    play_calls: Optional[int] = None
+    rest_calls: Optional[int] = None
+    sounds: Optional[int] = None
+    max_concurrent: Optional[int] = None
+    max_note_samples: Optional[int] = None
+    instructions: Optional[int] = None
+
+    @property
+    def determined(self):
+        return self.duration_ms is not None
+
+
+class UnknownControlFlow(Exception):
+    pass
+
+
+def note_samples(duration):
+    return int(SAMPLE_RATE * (duration / 1000.0))
+
+
+def add(x, y):
+    return None if x is None or y is None else x + y
+
+
+def scale(x, n):
+    return None if x is None or n is None else x * n
+
+
+def empty_stats():
+    return ResourceStats(0, 0, 0, 0, 0, 0, 0, 0)
+
+
+def sequence(first, second):
+    result = ResourceStats()
+    for item in fields(ResourceStats):
+        a, b = getattr(first, item.name), getattr(second, item.name)
+        if item.name == "max_note_samples":
+            setattr(result, item.name, None if a is None or b is None else max(a, b))
+        else:
+            setattr(result, item.name, add(a, b))
+    return result
+
+
+def repeat(stats, trips):
+    result = ResourceStats()
+    for item in fields(ResourceStats):
+        value = getattr(stats, item.name)
+        if item.name == "max_note_samples":
+            setattr(result, item.name, value if trips != 0 else 0)
+        else:
+            setattr(result, item.name, scale(value, trips))
+    return result
+
+
+def either(first, second):
+    result = ResourceStats()
+    for item in fields(ResourceStats):
+        a, b = getattr(first, item.name), getattr(second, item.name)
+        if item.name == "max_note_samples":
+            setattr(result, item.name, None if a is None or b is None else max(a, b))
+        else:
+            setattr(result, item.name, a if a == b else None)
+    return result
+
+
+def hull(a, b):
+    if a is None or b is None:
+        return None
+    return min(a[0], b[0]), max(a[1], b[1])
+
+
+def arithmetic(op, left, right):
+    if left is None or right is None:
+        return None
+    if op == "+":
+        return left[0] + right[0], left[1] + right[1]
+    if op == "-":
+        return left[0] - right[1], left[1] - right[0]
+    if op == "*":
+        corners = [a * b for a in left for b in right]
+        return min(corners), max(corners)
+    if op == "/":
+        if left[0] != left[1] or right[0] != right[1]:
+            return None
+        value = left[0] // right[0] if right[0] != 0 else 0
+        return value, value
+    if op == ">":
+        left, right = right, left
+    if op in {">", "<"}:
+        if left[1] < right[0]:
+            return 1, 1
+        if left[0] >= right[1]:
+            return 0, 0
+        return 0, 1
+    if left[0] == left[1] == right[0] == right[1]:
+        return 1, 1
+    if left[1] < right[0] or right[1] < left[0]:
+        return 0, 0
+    return 0, 1
+
+
+class ResourceAnalyzer:
+
+    def __init__(self, code):
+        self.code = code
+        self.labels = {quad.arg1: index for index, quad in enumerate(code) if quad.op == "label"}
+
+    def value(self, env, operand):
+        if is_int_literal(operand):
+            return to_int(operand), to_int(operand)
+        return env.get(operand, (0, 0))
+
+    def note(self, stats, freq, duration, rest):
+        if duration is not None:
+            duration = max(duration[0], 0), max(duration[1], 0)
+        if duration is None or duration[0] != duration[1]:
+            stats.duration_ms = stats.samples = None
+        else:
+            stats.duration_ms = add(stats.duration_ms, duration[0])
+        if rest:
+            stats.rest_calls = add(stats.rest_calls, 1)
+            return
+        stats.play_calls = add(stats.play_calls, 1)
+        if freq is None or duration is None:
+            stats.sounds = stats.samples = stats.max_note_samples = None
+            return
+        longest = note_samples(duration[1])
+        if freq[1] <= 0 or longest == 0:
+            return
+        if stats.max_note_samples is not None:
+            stats.max_note_samples = max(stats.max_note_samples, longest)
+        if freq[0] <= 0 or note_samples(duration[0]) == 0:
+            stats.sounds = stats.samples = None
+            return
+        stats.sounds = add(stats.sounds, 1)
+        stats.samples = add(stats.samples, longest if duration[0] == duration[1] else None)
+
+    def region(self, start, end, env):
+        stats = empty_stats()
+        params = []
+        index = start
+        while index < end:
+            quad = self.code[index]
+            op = quad.op
+            if op == "label":
+                index += 1
+                continue
+            if op == "=" and index + 2 < end and self.code[index + 2].op == "loop":
+                step, index = self.loop(index, end, env)
+                stats = sequence(stats, step)
+                continue
+            if op == "jumpt":
+                condition = self.value(env, quad.arg1)
+                if condition == (0, 0):
+                    stats.instructions = add(stats.instructions, 1)
+                    index += 1
+                elif condition is None or condition[0] <= 0 <= condition[1]:
+                    step, index = self.branch(index, end, env)
+                    stats = sequence(stats, step)
+                else:
+                    stats.instructions = add(stats.instructions, 1)
+                    index = self.forward(quad.arg2, index, end)
+                continue
+            stats.instructions = add(stats.instructions, 1)
+            if op == "jump":
+                index = self.forward(quad.arg1, index, end)
+                continue
+            if op in {"=", "+", "-", "*", "/", ">", "<", "=="}:
+                if op == "=":
+                    env[quad.result] = self.value(env, quad.arg1)
+                else:
+                    env[quad.result] = arithmetic(op, self.value(env, quad.arg1), self.value(env, quad.arg2))
+            elif op == "PLAY":
+                self.note(stats, self.value(env, quad.arg1), self.value(env, quad.arg2), False)
+            elif op == "REST":
+                self.note(stats, None, self.value(env, quad.arg1), True)
+            elif op == "PARAM":
+                params.append(self.value(env, quad.arg1))
+            elif op == "CALL" and quad.arg1 in {"play", "rest"}:
+                if quad.arg1 == "play":
+                    self.note(stats, params[-2], params[-1], False)
+                else:
+                    self.note(stats, None, params[-1], True)
+                params.clear()
+            else:
+                raise UnknownControlFlow()
+            index += 1
+        return stats
+
+    def forward(self, label, index, end):
+        target = self.labels.get(label)
+        if target is None or not index < target <= end:
+            raise UnknownControlFlow()
+        return target
+
+    def loop(self, index, end, env):
+        init, start, test = self.code[index:index + 3]
+        counter, exit_label = test.arg1, test.arg2
+        if start.op != "label" or init.result != counter:
+            raise UnknownControlFlow()
+        exit_index = self.forward(exit_label, index, end)
+        back_jump = self.code[exit_index - 1]
+        if back_jump.op != "jump" or back_jump.arg1 != start.arg1:
+            raise UnknownControlFlow()
+        times = self.value(env, init.arg1)
+        trips = max(times[0], 0) if times is not None and times[0] == times[1] else None
+        body = self.code[index + 3:exit_index - 1]
+        assigned = {quad.result for quad in body if quad.result is not None}
+        steps = self.induction_steps(body)
+        entry = {name: self.value(env, name) for name in steps}
+        for name in assigned | {counter}:
+            env[name] = None
+        for name, delta in steps.items():
+            span = scale(delta, trips)
+            if entry[name] is not None and span is not None:
+                env[name] = entry[name][0] + min(span, 0), entry[name][1] + max(span, 0)
+        summary = self.region(index + 3, exit_index - 1, env)
+        for name in assigned:
+            env[name] = None
+        for name, delta in steps.items():
+            if entry[name] is not None and trips is not None:
+                env[name] = entry[name][0] + delta * trips, entry[name][1] + delta * trips
+        env[counter] = None
+        stats = repeat(summary, trips)
+        stats.instructions = add(stats.instructions, scale(2, trips))
+        stats.instructions = add(stats.instructions, 2)
+        return stats, exit_index + 1
+
+    def induction_steps(self, body):
+        conditional = conditional_positions(body)
+        writes = {}
+        for position, quad in enumerate(body):
+            if quad.result is not None:
+                writes.setdefault(quad.result, []).append(position)
+        steps = {}
+        for name, positions in writes.items():
+            if len(positions) != 1 or positions[0] in conditional:
+                continue
+            quad = body[positions[0]]
+            if quad.op in {"+", "-"} and quad.arg1 == name and is_int_literal(quad.arg2):
+                steps[name] = to_int(quad.arg2) if quad.op == "+" else -to_int(quad.arg2)
+        return steps
+
+    def branch(self, index, end, env):
+        then_label = self.code[index].arg2
+        skip = self.code[index + 1] if index + 1 < end else None
+        if skip is None or skip.op != "jump" or self.labels.get(then_label) != index + 2:
+            raise UnknownControlFlow()
+        else_index = self.forward(skip.arg1, index + 1, end)
+        leave = self.code[else_index - 1]
+        if leave.op != "jump":
+            raise UnknownControlFlow()
+        if leave.arg1 == skip.arg1:
+            merge_index = else_index
+            otherwise = (else_index, else_index)
+            overhead = 2
+        else:
+            merge_index = self.forward(leave.arg1, else_index, end)
+            if self.code[merge_index - 1].op != "jump" or self.code[merge_index - 1].arg1 != leave.arg1:
+                raise UnknownControlFlow()
+            otherwise = (else_index + 1, merge_index - 1)
+            overhead = 3
+        then_env = dict(env)
+        taken = self.region(index + 3, else_index - 1, then_env)
+        taken.instructions = add(taken.instructions, 2)
+        skipped = self.region(otherwise[0], otherwise[1], env)
+        skipped.instructions = add(skipped.instructions, overhead)
+        for name in set(env) | set(then_env):
+            env[name] = hull(then_env.get(name, (0, 0)), env.get(name, (0, 0)))
+        return either(taken, skipped), merge_index + 1
+
+
+def analyze_resources(code):
+    try:
+        stats = ResourceAnalyzer(code).region(0, len(code), {})
+    except (UnknownControlFlow, RecursionError):
+        return ResourceStats()
+    if stats.sounds is not None:
+        stats.max_concurrent = min(stats.sounds, 1)
+    else:
+        stats.max_concurrent = None
+    return stats
+
+
+def format_stats(stats):
+    def show(value):
+        return "unknown" if value is None else f"{value:,}"
+
+    duration = "unknown" if stats.duration_ms is None else f"{stats.duration_ms / 1000:.3f} s"
+    return "\n".join([
+        f"Duration: {duration}",
+        f"Samples: {show(stats.samples)}",
+        f"play calls: {show(stats.play_calls)}",
+        f"rest calls: {show(stats.rest_calls)}",
+        f"Max concurrent sounds: {show(stats.max_concurrent)}",
+        f"Longest note: {show(stats.max_note_samples)} samples",
+        f"Executed instructions: {show(stats.instructions)}",
+    ])
@@ -5,7 +5,7 @@ from src.tokens import TokenType
 
 
 class Node:
-    pass
+    line = 0
 
 
 @dataclass
@@ -79,6 +79,11 @@ class CompareNode(Node):
     right: Node
 
 
+@dataclass
+class ImportNode(Node):
+    path: str
+
+
 @dataclass
 class ProgramNode(Node):
     statements: List[Node]
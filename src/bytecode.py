@@ -0,0 +1,79 @@
+import ast
+import hashlib
+import importlib.util
+import marshal
+from functools import lru_cache
+from pathlib import Path
+
+from src.codegen import RUNTIME, runtime_globals, runtime_limited, runtime_source
+
+
+CACHE_SUFFIX = ".msc"
+CACHE_MAGIC = b"MSC\x01" + importlib.util.MAGIC_NUMBER
+
+
+@lru_cache(maxsize=None)
+def runtime_body(profile=False, limited=False):
+    return tuple(ast.parse(runtime_source(profile, limited)).body)
+
+
+def literal_node(value):
+    if isinstance(value, list):
+        return ast.List([literal_node(item) for item in value], ast.Load())
+    if isinstance(value, tuple):
+        return ast.Tuple([literal_node(item) for item in value], ast.Load())
+    if isinstance(value, dict):
+        keys = [literal_node(key) for key in value]
+        values = [literal_node(item) for item in value.values()]
+        return ast.Dict(keys, values)
+    return ast.Constant(value)
+
+
+def build_module(code, profile_path=None, max_note_samples=0, limits=None):
+    body = [
+        ast.Import([ast.alias("pygame")]),
+        ast.Import([ast.alias("numpy", "np")]),
+    ]
+    for name, value in runtime_globals(code, profile_path, max_note_samples, limits):
+        body.append(ast.Assign([ast.Name(name, ast.Store())], literal_node(value)))
+    body.extend(runtime_body(profile_path is not None, runtime_limited(limits)))
+    return ast.fix_missing_locations(ast.Module(body, []))
+
+
+def compile_module(code, filename="<melodyscript>", profile_path=None, max_note_samples=0, limits=None):
+    return compile(build_module(code, profile_path, max_note_samples, limits), filename, "exec")
+
+
+def cache_path(source_path):
+    return Path(source_path).with_suffix(CACHE_SUFFIX)
+
+
+def cache_key(*parts):
+    digest = hashlib.sha256(RUNTIME.encode("utf-8"))
+    for part in parts:
+        digest.update(b"\0")
+        digest.update(str(part).encode("utf-8"))
+    return digest.digest()
+
+
+def load_cache(path, key):
+    try:
+        data = Path(path).read_bytes()
+    except OSError:
+        return None
+    header = CACHE_MAGIC + key
+    if not data.startswith(header):
+        return None
+    try:
+        return marshal.loads(data[len(header):])
+    except (EOFError, ValueError, TypeError):
+        return None
+
+
+def write_cache(path, key, code_object):
+    Path(path).write_bytes(CACHE_MAGIC + key + marshal.dumps(code_object))
+    return path
+
+
+def run_code(code_object):
+    exec(code_object, {"__name__": "__main__"})
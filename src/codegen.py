@@ -1,120 +1,330 @@
+import os
 from pathlib import Path
 
-def render_instructions(code):
-    lines = ["instructions = ["]
-    for quad in code:
-        op = repr(quad.op)
-        a1 = repr(quad.arg1)
-        a2 = repr(quad.arg2)
-        res = repr(quad.result)
-        lines.append(f"    ({op}, {a1}, {a2}, {res}),")
-    lines.append("]")
-    return "\n".join(lines)
+from src.regalloc import SlotAllocator, allocate_slots
 
 
-def generate(code, output_path="output.py"):
-    body = render_instructions(code)
-    runtime = """pygame.mixer.pre_init(44100, -16, 2, 512)
-pygame.init()
+PROFILE_MARKER = "#profile: "
+LIMITS_MARKER = "#limits: "
 
-label_positions = {}
-for i, ins in enumerate(instructions):
-    if ins[0] == 'label':
-        label_positions[ins[1]] = i
 
-env = {}
-params = []
-pc = 0
+TONE_KERNEL = """
+tone_ramp = np.empty(0, dtype=np.float64)
+tone_cycles = np.empty(0, dtype=np.float64)
+tone_whole = np.empty(0, dtype=np.float64)
+tone_phase = np.empty(0, dtype=np.float32)
+tone_stereo = np.empty((0, 2), dtype=np.int16)
 
 
-def value(x):
-    if x is None:
-        return None
-    if isinstance(x, int):
-        return x
-    if isinstance(x, str) and x.lstrip('-').isdigit():
-        return int(x)
-    return env.get(x, 0)
+def reserve_tone_buffers(n_samples):
+    global tone_ramp, tone_cycles, tone_whole, tone_phase, tone_stereo
+    if n_samples > len(tone_ramp):
+        tone_ramp = np.arange(n_samples, dtype=np.float64)
+        tone_cycles = np.empty(n_samples, dtype=np.float64)
+        tone_whole = np.empty(n_samples, dtype=np.float64)
+        tone_phase = np.empty(n_samples, dtype=np.float32)
+        tone_stereo = np.empty((n_samples, 2), dtype=np.int16)
 
 
 def generate_tone(freq, duration_ms):
-    sample_rate = 44100
-    n_samples = int(sample_rate * (duration_ms / 1000.0))
-    t = np.linspace(0, duration_ms / 1000.0, n_samples, False)
-    wave = np.sin(2 * np.pi * freq * t) * 4096
-    wave = wave.astype(np.int16)
-    return np.column_stack((wave, wave))
+    n_samples = max(int(44100 * (duration_ms / 1000.0)), 0)
+    reserve_tone_buffers(n_samples)
+    step = (duration_ms / 1000.0) / n_samples if n_samples else 0.0
+    cycles = tone_cycles[:n_samples]
+    whole = tone_whole[:n_samples]
+    phase = tone_phase[:n_samples]
+    stereo = tone_stereo[:n_samples]
+    np.multiply(tone_ramp[:n_samples], step * freq, out=cycles)
+    np.floor(cycles, out=whole)
+    np.subtract(cycles, whole, out=cycles)
+    np.multiply(cycles, 2 * np.pi, out=phase, casting="same_kind")
+    np.sin(phase, out=phase)
+    np.multiply(phase, 4096, out=stereo[:, 0], casting="unsafe")
+    np.copyto(stereo[:, 1], stereo[:, 0])
+    return stereo
+"""
 
 
-while pc < len(instructions):
-    op, a1, a2, res = instructions[pc]
+RUNTIME = """#profile: import json
+#profile: from time import perf_counter
+#profile: 
+#limits: from time import monotonic
+#limits: 
+""" + TONE_KERNEL + """
+pygame.mixer.pre_init(44100, -16, 2, 512)
+pygame.init()
+
+regs = [0] * slot_count
+for slot, constant in constants:
+    regs[slot] = constant
+params = []
+reserve_tone_buffers(max_note_samples)
+pc = 0
+end = len(instructions)
+#limits: fuel = -1 if max_instructions is None else max_instructions
+#limits: deadline = float("inf") if run_seconds is None else monotonic() + run_seconds
+#limits: audio_ms = 0
+#limits: 
+#limits: 
+#limits: def charge_audio(dur):
+#limits:     global audio_ms
+#limits:     wait_ms = max(int(dur), 0)
+#limits:     audio_ms += wait_ms
+#limits:     if max_audio_ms is not None and audio_ms > max_audio_ms:
+#limits:         raise SystemExit(f"Error: Score exceeded {max_audio_ms / 1000:g}s of audio")
+#limits:     if monotonic() + wait_ms / 1000 > deadline:
+#limits:         raise SystemExit(f"Error: Waiting {wait_ms} ms would exceed the {run_seconds:g}s time budget")
+#limits: 
+#limits: 
+#profile: pc_counts = [0] * (end + 1)
+#profile: pc_time = [0.0] * (end + 1)
+#profile: call_synth = [0.0] * (end + 1)
+#profile: call_wait = [0.0] * (end + 1)
+#profile: last_pc = end
+#profile: last_time = perf_counter()
+#profile: 
+#profile: 
+#profile: def write_profile():
+#profile:     pc_time[last_pc] += perf_counter() - last_time
+#profile:     opcodes = {}
+#profile:     lines = {}
+#profile:     hot = []
+#profile:     calls = []
+#profile:     for index, ins in enumerate(instructions):
+#profile:         count = pc_counts[index]
+#profile:         if count == 0:
+#profile:             continue
+#profile:         line = source_lines[index]
+#profile:         elapsed = pc_time[index]
+#profile:         op_stats = opcodes.setdefault(ins[0], {"count": 0, "time": 0.0})
+#profile:         op_stats["count"] += count
+#profile:         op_stats["time"] += elapsed
+#profile:         line_stats = lines.setdefault(line, {"line": line, "count": 0, "time": 0.0})
+#profile:         line_stats["count"] += count
+#profile:         line_stats["time"] += elapsed
+#profile:         hot.append({"pc": index, "op": ins[0], "line": line, "count": count, "time": elapsed})
+#profile:         if ins[0] in ('PLAY', 'REST', 'CALL'):
+#profile:             calls.append({
+#profile:                 "pc": index, "function": ins[1] if ins[0] == 'CALL' else ins[0].lower(),
+#profile:                 "line": line, "count": count,
+#profile:                 "synth_time": call_synth[index], "wait_time": call_wait[index],
+#profile:             })
+#profile:     labels = [
+#profile:         {"label": name, "pc": target, "line": source_lines[target] if target < end else 0,
+#profile:          "hits": pc_counts[target]}
+#profile:         for target, name in label_names
+#profile:     ]
+#profile:     report = {
+#profile:         "instructions": sum(pc_counts),
+#profile:         "time": sum(pc_time),
+#profile:         "opcodes": opcodes,
+#profile:         "labels": labels,
+#profile:         "calls": calls,
+#profile:         "lines": sorted(lines.values(), key=lambda item: item["time"], reverse=True),
+#profile:         "hot": sorted(hot, key=lambda item: item["time"], reverse=True)[:20],
+#profile:     }
+#profile:     with open(profile_path, "w", encoding="utf-8") as report_file:
+#profile:         json.dump(report, report_file, indent=2)
 
-    if op == 'label':
-        pc += 1
-        continue
+
+while pc < end:
+    op, a1, a2, res = instructions[pc]
+    #profile: now = perf_counter()
+    #profile: pc_time[last_pc] += now - last_time
+    #profile: pc_counts[pc] += 1
+    #profile: last_pc = pc
+    #profile: last_time = now
+    #limits: fuel -= 1
+    #limits: if fuel == -1:
+    #limits:     raise SystemExit(f"Error: Program exceeded {max_instructions} executed instructions")
+    #limits: if fuel % 4096 == 0 and monotonic() > deadline:
+    #limits:     raise SystemExit(f"Error: Program exceeded its {run_seconds:g}s time budget")
 
     if op == '=':
-        env[res] = value(a1)
-
-    elif op in ('+', '-', '*', '/'):
-        v1 = value(a1)
-        v2 = value(a2)
-        if op == '+':
-            env[res] = v1 + v2
-        elif op == '-':
-            env[res] = v1 - v2
-        elif op == '*':
-            env[res] = v1 * v2
-        else:
-            env[res] = v1 // v2 if v2 != 0 else 0
-
-    elif op in ('>', '<', '=='):
-        v1 = value(a1)
-        v2 = value(a2)
-        if op == '>':
-            env[res] = 1 if v1 > v2 else 0
-        elif op == '<':
-            env[res] = 1 if v1 < v2 else 0
-        else:
-            env[res] = 1 if v1 == v2 else 0
+        regs[res] = regs[a1]
+
+    elif op == '+':
+        regs[res] = regs[a1] + regs[a2]
+
+    elif op == '-':
+        regs[res] = regs[a1] - regs[a2]
+
+    elif op == '*':
+        regs[res] = regs[a1] * regs[a2]
+
+    elif op == '/':
+        v2 = regs[a2]
+        regs[res] = regs[a1] // v2 if v2 != 0 else 0
+
+    elif op == '>':
+        regs[res] = 1 if regs[a1] > regs[a2] else 0
+
+    elif op == '<':
+        regs[res] = 1 if regs[a1] < regs[a2] else 0
+
+    elif op == '==':
+        regs[res] = 1 if regs[a1] == regs[a2] else 0
+
+    elif op == 'PLAY':
+        freq = regs[a1]
+        dur = regs[a2]
+        #limits: charge_audio(dur)
+        if freq > 0:
+            #profile: synth_start = perf_counter()
+            tone = generate_tone(freq, dur)
+            sound = pygame.sndarray.make_sound(tone)
+            sound.play()
+            #profile: call_synth[pc] += perf_counter() - synth_start
+        #profile: wait_start = perf_counter()
+        pygame.time.wait(int(dur))
+        #profile: call_wait[pc] += perf_counter() - wait_start
+
+    elif op == 'REST':
+        #limits: charge_audio(regs[a1])
+        #profile: wait_start = perf_counter()
+        pygame.time.wait(int(regs[a1]))
+        #profile: call_wait[pc] += perf_counter() - wait_start
 
     elif op == 'PARAM':
-        params.append(value(a1))
+        params.append(regs[a1])
 
     elif op == 'CALL':
         if a1 == 'play':
             freq = params[-2]
             dur = params[-1]
+            #limits: charge_audio(dur)
             if freq > 0:
+                #profile: synth_start = perf_counter()
                 tone = generate_tone(freq, dur)
                 sound = pygame.sndarray.make_sound(tone)
                 sound.play()
+                #profile: call_synth[pc] += perf_counter() - synth_start
+            #profile: wait_start = perf_counter()
             pygame.time.wait(int(dur))
+            #profile: call_wait[pc] += perf_counter() - wait_start
             params.clear()
 
         elif a1 == 'rest':
             dur = params[-1]
+            #limits: charge_audio(dur)
+            #profile: wait_start = perf_counter()
             pygame.time.wait(int(dur))
+            #profile: call_wait[pc] += perf_counter() - wait_start
             params.clear()
 
+    elif op == 'loop':
+        if regs[a1] <= 0:
+            pc = a2
+            continue
+        regs[a1] -= 1
+
     elif op == 'jumpt':
-        if value(a1) != 0:
-            pc = label_positions[a2]
+        if regs[a1] != 0:
+            pc = a2
             continue
 
     elif op == 'jump':
-        pc = label_positions[a1]
+        pc = a1
         continue
 
     pc += 1
 
+#profile: write_profile()
 pygame.quit()
 """
+
+
+def runtime_source(profile=False, limited=False):
+    enabled = {PROFILE_MARKER: profile, LIMITS_MARKER: limited}
+    lines = []
+    for line in RUNTIME.split("\n"):
+        stripped = line.lstrip()
+        marker = next((marker for marker in enabled if stripped.startswith(marker)), None)
+        if marker is None:
+            lines.append(line)
+        elif enabled[marker]:
+            indent = line[:len(line) - len(stripped)]
+            lines.append((indent + stripped[len(marker):]).rstrip())
+    return "\n".join(lines)
+
+
+def runtime_limited(limits):
+    return limits is not None and limits.enforced_at_runtime
+
+
+def profile_path_for(output_path):
+    return str(Path(output_path).with_suffix(".profile.json"))
+
+
+def allocator_globals(allocator, profile_path=None, max_note_samples=0, limits=None):
+    names = [
+        ("constants", allocator.constant_table()),
+        ("slot_count", allocator.slot_count),
+        ("max_note_samples", max_note_samples),
+    ]
+    if profile_path is not None:
+        names += [
+            ("source_lines", allocator.lines),
+            ("label_names", allocator.labels),
+            ("profile_path", profile_path),
+        ]
+    if runtime_limited(limits):
+        names += limits.runtime_globals()
+    return names
+
+
+def runtime_globals(code, profile_path=None, max_note_samples=0, limits=None):
+    allocator, instructions = allocate_slots(code, profile_path is not None)
+    names = allocator_globals(allocator, profile_path, max_note_samples, limits)
+    return [("instructions", instructions)] + names
+
+
+def render_global(name, value):
+    if not isinstance(value, list):
+        return f"{name} = {value!r}"
+    lines = [f"{name} = ["]
+    for item in value:
+        lines.append(f"    {item!r},")
+    lines.append("]")
+    return "\n".join(lines)
+
+
+def render_instructions(code, profile_path=None, max_note_samples=0, limits=None):
+    names = runtime_globals(code, profile_path, max_note_samples, limits)
+    return "\n\n".join(render_global(name, value) for name, value in names)
+
+
+def generate(code, output_path="output.py", profile=False, max_note_samples=0, limits=None):
+    profile_path = profile_path_for(output_path) if profile else None
+    body = render_instructions(code, profile_path, max_note_samples, limits)
     content_lines = [
         "import pygame",
         "import numpy as np",
         body,
-        runtime,
+        runtime_source(profile, runtime_limited(limits)),
     ]
     Path(output_path).write_text("\n\n".join(content_lines), encoding="utf-8")
     return output_path
+
+
+def generate_stream(chunks, output_path="output.py", profile=False, limits=None):
+    profile_path = profile_path_for(output_path) if profile else None
+    allocator = SlotAllocator(profile)
+    partial_path = f"{output_path}.partial"
+    try:
+        with open(partial_path, "w", encoding="utf-8") as out:
+            out.write("import pygame\n\nimport numpy as np\n\ninstructions = [\n")
+            for chunk in chunks:
+                for instruction in allocator.lower(chunk):
+                    out.write(f"    {instruction!r},\n")
+            out.write("]")
+            for name, value in allocator_globals(allocator, profile_path, 0, limits):
+                out.write("\n\n")
+                out.write(render_global(name, value))
+            out.write("\n\n")
+            out.write(runtime_source(profile, runtime_limited(limits)))
+    except BaseException:
+        Path(partial_path).unlink(missing_ok=True)
+        raise
+    os.replace(partial_path, output_path)
+    return output_path
@@ -8,3 +8,7 @@ class CompilerError(Exception):
         if self.line:
             return f"Error on line {self.line}: {self.message}"
         return self.message
+
+
+class ResourceLimitError(CompilerError):
+    pass
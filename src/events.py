@@ -0,0 +1,117 @@
+from dataclasses import dataclass
+
+from src.errors import CompilerError, ResourceLimitError
+from src.limits import CHECK_INTERVAL
+
+
+@dataclass
+class Event:
+    freq: int
+    duration: int
+    rest: bool = False
+    line: int = 0
+
+
+def label_positions(code):
+    positions = {}
+    for index, quad in enumerate(code):
+        if quad.op == 'label':
+            positions[quad.arg1] = index
+    return positions
+
+
+def value(env, x):
+    if x is None:
+        return None
+    if isinstance(x, int):
+        return x
+    if isinstance(x, str) and x.lstrip('-').isdigit():
+        return int(x)
+    return env.get(x, 0)
+
+
+def run_events(code, max_steps=None, budget=None, max_audio_ms=None):
+    labels = label_positions(code)
+    env = {}
+    params = []
+    pc = 0
+    steps = 0
+    audio_ms = 0
+    while pc < len(code):
+        event = None
+        quad = code[pc]
+        op, a1, a2, res = quad.op, quad.arg1, quad.arg2, quad.result
+        if op == 'label':
+            pc += 1
+            continue
+        steps += 1
+        if max_steps is not None and steps > max_steps:
+            raise ResourceLimitError(0, f"Program exceeded {max_steps} executed instructions")
+        if budget is not None and steps % CHECK_INTERVAL == 0:
+            budget.check()
+
+        if op == '=':
+            env[res] = value(env, a1)
+
+        elif op in ('+', '-', '*', '/'):
+            v1 = value(env, a1)
+            v2 = value(env, a2)
+            if op == '+':
+                env[res] = v1 + v2
+            elif op == '-':
+                env[res] = v1 - v2
+            elif op == '*':
+                env[res] = v1 * v2
+            else:
+                env[res] = v1 // v2 if v2 != 0 else 0
+
+        elif op in ('>', '<', '=='):
+            v1 = value(env, a1)
+            v2 = value(env, a2)
+            if op == '>':
+                env[res] = 1 if v1 > v2 else 0
+            elif op == '<':
+                env[res] = 1 if v1 < v2 else 0
+            else:
+                env[res] = 1 if v1 == v2 else 0
+
+        elif op == 'PLAY':
+            event = Event(value(env, a1), int(value(env, a2)), False, quad.line)
+
+        elif op == 'REST':
+            event = Event(0, int(value(env, a1)), True, quad.line)
+
+        elif op == 'PARAM':
+            params.append(value(env, a1))
+
+        elif op == 'CALL':
+            if a1 == 'play':
+                event = Event(params[-2], int(params[-1]), False, quad.line)
+            elif a1 == 'rest':
+                event = Event(0, int(params[-1]), True, quad.line)
+            params.clear()
+
+        elif op == 'loop':
+            if env.get(a1, 0) <= 0:
+                pc = labels[a2]
+                continue
+            env[a1] -= 1
+
+        elif op == 'jumpt':
+            if value(env, a1) != 0:
+                pc = labels[a2]
+                continue
+
+        elif op == 'jump':
+            pc = labels[a1]
+            continue
+
+        else:
+            raise CompilerError(0, f"Unknown instruction: {op}")
+
+        if event is not None:
+            audio_ms += max(event.duration, 0)
+            if max_audio_ms is not None and audio_ms > max_audio_ms:
+                raise ResourceLimitError(0, f"Score exceeded {max_audio_ms / 1000:g}s of audio")
+            yield event
+        pc += 1
@@ -1,12 +1,18 @@
+import re
+
 from src.ast_nodes import (
     AssignmentNode, BinOpNode, BlockNode, CompareNode, FunctionCallNode,
-    IdentifierNode, IfNode, NoteNode, NumberNode, ProgramNode, RepeatNode,
-    RestNode, VarDeclNode
+    IdentifierNode, IfNode, ImportNode, NoteNode, NumberNode, ProgramNode,
+    RepeatNode, RestNode, VarDeclNode
 )
 from src.errors import CompilerError
 from src.tokens import TokenType
 
 
+TEMP_PREFIX = "$t"
+temp_pattern = re.compile(r"\$t[0-9]+")
+
+
 NOTE_FREQS = {
     "C0": 16, "C#0": 17, "Db0": 17, "D0": 18, "D#0": 19, "Eb0": 19,
     "E0": 21, "F0": 22, "F#0": 23, "Gb0": 23, "G0": 25, "G#0": 26,
@@ -48,11 +54,12 @@ NOTE_FREQS = {
 
 class Quadruple:
     
-    def __init__(self, op, arg1, arg2, result):
+    def __init__(self, op, arg1, arg2, result, line=0):
         self.op = op
         self.arg1 = arg1
         self.arg2 = arg2
         self.result = result
+        self.line = line
     
     def __repr__(self):
         return f"({self.op}, {self.arg1}, {self.arg2}, {self.result})"
@@ -64,33 +71,46 @@ class ICGenerator:
         self.code = []
         self.temp_counter = 0
         self.label_counter = 0
+        self.line = 0
     
     def new_temp(self):
         self.temp_counter += 1
-        return f"t{self.temp_counter}"
+        return f"{TEMP_PREFIX}{self.temp_counter}"
     
     def new_label(self):
         self.label_counter += 1
         return f"L{self.label_counter}"
     
     def emit(self, op, arg1=None, arg2=None, result=None):
-        self.code.append(Quadruple(op, arg1, arg2, result))
+        self.code.append(Quadruple(op, arg1, arg2, result, self.line))
     
     def generate(self, program):
         self.visit(program)
         return self.code
     
+    def generate_statement(self, statement):
+        self.code = []
+        self.visit(statement)
+        return self.code
+    
     def visit(self, node):
         method_name = f"visit_{node.__class__.__name__}"
         method = getattr(self, method_name, None)
         if method is None:
             raise CompilerError(0, f"No visit method for {node.__class__.__name__}")
-        return method(node)
+        outer_line = self.line
+        self.line = node.line or outer_line
+        result = method(node)
+        self.line = outer_line
+        return result
     
     def visit_ProgramNode(self, node):
         for statement in node.statements:
             self.visit(statement)
     
+    def visit_ImportNode(self, node):
+        self.emit('import', node.path, None, None)
+    
     def visit_VarDeclNode(self, node):
         value_result = self.visit(node.value)
         
@@ -1,3 +1,4 @@
+import io
 import re
 
 from src.errors import CompilerError
@@ -17,6 +18,7 @@ keyword_map = {
     "else": TokenType.ELSE_KW,
     "play": TokenType.PLAY_KW,
     "rest": TokenType.REST_KW,
+    "import": TokenType.IMPORT_KW,
 }
 
 
@@ -37,64 +39,83 @@ symbol_map = {
 }
 
 
-def tokenize(source):
-    tokens = []
-    length = len(source)
+def scan_line(text, line):
+    length = len(text)
     index = 0
-    line = 1
     column = 1
     while index < length:
-        ch = source[index]
+        ch = text[index]
         if ch == " " or ch == "\t":
             index += 1
             column += 1
             continue
-        if ch == "\n":
-            index += 1
-            line += 1
-            column = 1
-            continue
-        if ch == "/" and index + 1 < length and source[index + 1] == "/":
-            while index < length and source[index] != "\n":
-                index += 1
-                column += 1
-            continue
-        if source.startswith("==", index):
-            tokens.append(Token(TokenType.EQUALS, "==", line, column))
+        if ch == "/" and index + 1 < length and text[index + 1] == "/":
+            break
+        if text.startswith("==", index):
+            yield Token(TokenType.EQUALS, "==", line, column)
             index += 2
             column += 2
             continue
+        if ch == '"':
+            end = text.find('"', index + 1)
+            if end == -1:
+                raise CompilerError(line, "Unterminated string literal")
+            value = text[index + 1:end]
+            yield Token(TokenType.STRING_VAL, value, line, column)
+            span = end + 1 - index
+            index += span
+            column += span
+            continue
         if ch in symbol_map:
             token_type = symbol_map[ch]
-            tokens.append(Token(token_type, ch, line, column))
+            yield Token(token_type, ch, line, column)
             index += 1
             column += 1
             continue
-        note_match = note_pattern.match(source, index)
+        note_match = note_pattern.match(text, index)
         if note_match:
             value = note_match.group(0)
-            tokens.append(Token(TokenType.NOTE_VAL, value, line, column))
+            yield Token(TokenType.NOTE_VAL, value, line, column)
             span = len(value)
             index += span
             column += span
             continue
-        num_match = number_pattern.match(source, index)
+        num_match = number_pattern.match(text, index)
         if num_match:
             value = num_match.group(0)
-            tokens.append(Token(TokenType.NUM, value, line, column))
+            yield Token(TokenType.NUM, value, line, column)
             span = len(value)
             index += span
             column += span
             continue
-        id_match = identifier_pattern.match(source, index)
+        id_match = identifier_pattern.match(text, index)
         if id_match:
             value = id_match.group(0)
             token_type = keyword_map.get(value, TokenType.ID)
-            tokens.append(Token(token_type, value, line, column))
+            yield Token(token_type, value, line, column)
             span = len(value)
             index += span
             column += span
             continue
         raise CompilerError(line, f"Unexpected character: {ch}")
-    tokens.append(Token(TokenType.EOF, "", line, column))
-    return tokens
+
+
+def iter_tokens(lines):
+    line = 0
+    column = 1
+    ended = False
+    for text in lines:
+        line += 1
+        ended = text.endswith("\n")
+        if ended:
+            text = text[:-1]
+        yield from scan_line(text, line)
+        column = len(text) + 1
+    if ended or line == 0:
+        line += 1
+        column = 1
+    yield Token(TokenType.EOF, "", line, column)
+
+
+def tokenize(source):
+    return list(iter_tokens(io.StringIO(source)))
@@ -0,0 +1,82 @@
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Optional
+
+from src.errors import ResourceLimitError
+
+
+CHECK_INTERVAL = 4096
+
+
+@dataclass
+class ResourceLimits:
+    max_instructions: Optional[int] = None
+    max_duration: Optional[float] = None
+    max_quadruples: Optional[int] = None
+    phase_seconds: Optional[float] = None
+
+    @property
+    def enforced_at_runtime(self):
+        return any(value is not None for value in (self.max_instructions, self.max_duration, self.phase_seconds))
+
+    @property
+    def max_audio_ms(self):
+        return None if self.max_duration is None else int(self.max_duration * 1000)
+
+    def runtime_globals(self):
+        return [
+            ("max_instructions", self.max_instructions),
+            ("max_audio_ms", self.max_audio_ms),
+            ("run_seconds", self.phase_seconds),
+        ]
+
+    def check_quadruples(self, count):
+        if self.max_quadruples is not None and count > self.max_quadruples:
+            raise ResourceLimitError(
+                0, f"Program has {count} quadruples, exceeding the limit of {self.max_quadruples}"
+            )
+
+    def check_instructions(self, count):
+        if self.max_instructions is not None and count is not None and count > self.max_instructions:
+            raise ResourceLimitError(
+                0, f"Program executes {count} instructions, exceeding the limit of {self.max_instructions}"
+            )
+
+    def check_duration(self, duration_ms):
+        if self.max_duration is None or duration_ms is None:
+            return
+        if duration_ms > self.max_duration * 1000:
+            raise ResourceLimitError(
+                0, f"Score lasts {duration_ms / 1000:.1f}s, exceeding the {self.max_duration:g}s limit"
+            )
+
+    @contextmanager
+    def phase(self, name):
+        budget = PhaseBudget(name, self.phase_seconds)
+        yield budget
+        budget.check()
+
+
+class PhaseBudget:
+
+    def __init__(self, name, seconds=None):
+        self.name = name
+        self.seconds = seconds
+        self.start = time.monotonic()
+
+    def expired(self):
+        return self.seconds is not None and time.monotonic() - self.start > self.seconds
+
+    def check(self):
+        if self.expired():
+            raise ResourceLimitError(0, f"{self.name} phase exceeded its {self.seconds:g}s time budget")
+
+
+def limit_chunks(chunks, limits, budget):
+    count = 0
+    for chunk in chunks:
+        count += len(chunk)
+        limits.check_quadruples(count)
+        budget.check()
+        yield chunk
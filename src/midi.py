@@ -0,0 +1,54 @@
+import math
+from pathlib import Path
+
+from src.events import run_events
+
+
+TICKS_PER_QUARTER = 1000
+MICROSECONDS_PER_QUARTER = 1000000
+VELOCITY = 100
+
+
+def note_number(freq):
+    if freq <= 0:
+        return None
+    number = round(69 + 12 * math.log2(freq / 440))
+    return min(max(number, 0), 127)
+
+
+def variable_length(value):
+    data = [value & 0x7F]
+    value >>= 7
+    while value:
+        data.append((value & 0x7F) | 0x80)
+        value >>= 7
+    return bytes(reversed(data))
+
+
+def render_track(events):
+    track = bytearray()
+    track += variable_length(0) + b"\xff\x51\x03" + MICROSECONDS_PER_QUARTER.to_bytes(3, "big")
+    delta = 0
+    for event in events:
+        number = note_number(event.freq)
+        duration = max(event.duration, 0)
+        if number is None or duration == 0:
+            delta += duration
+            continue
+        track += variable_length(delta) + bytes((0x90, number, VELOCITY))
+        track += variable_length(duration) + bytes((0x80, number, 0))
+        delta = 0
+    track += variable_length(delta) + b"\xff\x2f\x00"
+    return bytes(track)
+
+
+def render_midi(events):
+    track = render_track(events)
+    header = b"MThd" + (6).to_bytes(4, "big") + (0).to_bytes(2, "big")
+    header += (1).to_bytes(2, "big") + TICKS_PER_QUARTER.to_bytes(2, "big")
+    return header + b"MTrk" + len(track).to_bytes(4, "big") + track
+
+
+def generate_midi(code, output_path="output.mid", max_steps=None, budget=None, max_audio_ms=None):
+    Path(output_path).write_bytes(render_midi(run_events(code, max_steps, budget, max_audio_ms)))
+    return output_path
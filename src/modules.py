@@ -0,0 +1,229 @@
+import hashlib
+import marshal
+from pathlib import Path
+
+from src.ast_nodes import ImportNode
+from src.errors import CompilerError
+from src.icg import TEMP_PREFIX, ICGenerator, Quadruple, temp_pattern
+from src.lexer import iter_tokens, tokenize
+from src.optimizer import optimize, optimize_stream
+from src.parser import Parser
+from src.semantic import SemanticAnalyzer
+from src.unroll import DEFAULT_BUDGET, unroll_loops, unroll_top_level
+
+
+UNIT_SUFFIX = ".msu"
+UNIT_MAGIC = b"MSU\x04"
+
+
+def read_source(path):
+    try:
+        return Path(path).read_text(encoding="utf-8")
+    except FileNotFoundError:
+        raise CompilerError(0, f"File not found: {path}")
+
+
+def iter_source_lines(path):
+    try:
+        source = open(path, encoding="utf-8")
+    except FileNotFoundError:
+        raise CompilerError(0, f"File not found: {path}")
+    with source:
+        yield from source
+
+
+def source_digest(source, *options):
+    digest = hashlib.sha256(source.encode("utf-8"))
+    for option in options:
+        digest.update(f"\0{option}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def export_digest(exports):
+    return hashlib.sha256(repr(sorted(exports.items())).encode("utf-8")).hexdigest()
+
+
+def unit_path(path):
+    return Path(path).with_suffix(UNIT_SUFFIX)
+
+
+def read_unit(path, digest):
+    try:
+        data = Path(path).read_bytes()
+    except OSError:
+        return None
+    if not data.startswith(UNIT_MAGIC):
+        return None
+    try:
+        record = marshal.loads(data[len(UNIT_MAGIC):])
+    except (EOFError, ValueError, TypeError):
+        return None
+    if record.get("source") != digest:
+        return None
+    return record
+
+
+def write_unit(unit):
+    record = {
+        "source": unit.source_digest,
+        "exports": unit.exports,
+        "imports": [(raw, dep.export_digest) for raw, dep in unit.imports.items()],
+        "code": [(quad.op, quad.arg1, quad.arg2, quad.result, quad.line) for quad in unit.code],
+    }
+    unit_path(unit.path).write_bytes(UNIT_MAGIC + marshal.dumps(record))
+
+
+class CompilationUnit:
+
+    def __init__(self, path, source_digest, exports, code, imports):
+        self.path = path
+        self.source_digest = source_digest
+        self.exports = exports
+        self.code = code
+        self.imports = imports
+        self.export_digest = export_digest(exports)
+
+
+class ModuleLoader:
+
+    def __init__(self, use_cache=True, unroll_budget=DEFAULT_BUDGET):
+        self.use_cache = use_cache
+        self.unroll_budget = unroll_budget
+        self.units = {}
+        self.loading = []
+
+    def digests(self):
+        return [unit.source_digest for unit in self.units.values()]
+
+    def load(self, path):
+        path = Path(path).resolve()
+        if path in self.units:
+            return self.units[path]
+        if path in self.loading:
+            cycle = " -> ".join(p.name for p in self.loading[self.loading.index(path):] + [path])
+            raise CompilerError(0, f"Circular import: {cycle}")
+        self.loading.append(path)
+        try:
+            source = read_source(path)
+            unit = self.load_cached(path, source) or self.compile(path, source)
+        finally:
+            self.loading.pop()
+        self.units[path] = unit
+        return unit
+
+    def load_cached(self, path, source):
+        if not self.use_cache:
+            return None
+        digest = source_digest(source, self.unroll_budget)
+        record = read_unit(unit_path(path), digest)
+        if record is None:
+            return None
+        imports = {}
+        for raw, dep_digest in record["imports"]:
+            dep = self.load(path.parent / raw)
+            if dep.export_digest != dep_digest:
+                return None
+            imports[raw] = dep
+        code = [Quadruple(*quad) for quad in record["code"]]
+        return CompilationUnit(path, digest, record["exports"], code, imports)
+
+    def compile(self, path, source):
+        program = Parser(tokenize(source)).parse_program()
+        imports = {}
+        for statement in program.statements:
+            if isinstance(statement, ImportNode) and statement.path not in imports:
+                imports[statement.path] = self.load(path.parent / statement.path)
+        analyzer = SemanticAnalyzer({raw: dep.exports for raw, dep in imports.items()})
+        analyzer.analyze(program)
+        program = unroll_loops(program, self.unroll_budget)
+        code = optimize(ICGenerator().generate(program))
+        digest = source_digest(source, self.unroll_budget)
+        unit = CompilationUnit(path, digest, analyzer.exports(str(path)), code, imports)
+        if self.use_cache:
+            write_unit(unit)
+        return unit
+
+
+class Linker:
+
+    def __init__(self):
+        self.linked = set()
+        self.temp_counter = 0
+        self.label_counter = 0
+
+    def new_temp(self):
+        self.temp_counter += 1
+        return f"{TEMP_PREFIX}{self.temp_counter}"
+
+    def new_label(self):
+        self.label_counter += 1
+        return f"L{self.label_counter}"
+
+    def link(self, unit):
+        self.linked.add(unit.path)
+        return self.link_code(unit.code, unit.imports)
+
+    def link_code(self, code, imports):
+        temps = {}
+        labels = {}
+        linked = []
+        for quad in code:
+            if quad.op == 'import':
+                dep = imports[quad.arg1]
+                if dep.path not in self.linked:
+                    linked.extend(self.link(dep))
+                continue
+            linked.append(self.rename(quad, temps, labels))
+        return linked
+
+    def rename(self, quad, temps, labels):
+        def temp(name):
+            if isinstance(name, str) and temp_pattern.fullmatch(name):
+                if name not in temps:
+                    temps[name] = self.new_temp()
+                return temps[name]
+            return name
+
+        def label(name):
+            if name not in labels:
+                labels[name] = self.new_label()
+            return labels[name]
+
+        op, a1, a2, res, line = quad.op, quad.arg1, quad.arg2, quad.result, quad.line
+        if op in {'label', 'jump'}:
+            return Quadruple(op, label(a1), a2, res, line)
+        if op in {'jumpt', 'loop'}:
+            return Quadruple(op, temp(a1), label(a2), res, line)
+        return Quadruple(op, temp(a1), temp(a2), temp(res), line)
+
+
+def link(unit):
+    return Linker().link(unit)
+
+
+def iter_statement_code(path, loader, imports):
+    analyzer = SemanticAnalyzer()
+    icg = ICGenerator()
+    parser = Parser(iter_tokens(iter_source_lines(path)))
+    for statement in parser.iter_statements():
+        if isinstance(statement, ImportNode) and statement.path not in imports:
+            dep = loader.load(path.parent / statement.path)
+            imports[statement.path] = dep
+            analyzer.imports[statement.path] = dep.exports
+        analyzer.visit(statement)
+        for node in unroll_top_level(statement, loader.unroll_budget):
+            yield icg.generate_statement(node)
+
+
+def stream_program(path, loader):
+    path = Path(path).resolve()
+    linker = Linker()
+    linker.linked.add(path)
+    imports = {}
+    loader.loading.append(path)
+    try:
+        chunks = iter_statement_code(path, loader, imports)
+        for chunk in optimize_stream(chunks):
+            yield linker.link_code(chunk, imports)
+    finally:
+        loader.loading.remove(path)
@@ -1,4 +1,7 @@
+import itertools
+
 from src.errors import CompilerError
+from src.icg import temp_pattern
 
 
 def is_int_literal(value):
@@ -17,47 +20,87 @@ def to_int(value):
     return int(value)
 
 
+def rewrite(quad, op, arg1, arg2, result):
+    return type(quad)(op, arg1, arg2, result, quad.line)
+
+
+def fold_quad(quad):
+    op, a1, a2, res = quad.op, quad.arg1, quad.arg2, quad.result
+    if op in {"+", "-", "*", "/"}:
+        if is_int_literal(a1) and is_int_literal(a2):
+            v1 = to_int(a1)
+            v2 = to_int(a2)
+            if op == "+":
+                val = v1 + v2
+            elif op == "-":
+                val = v1 - v2
+            elif op == "*":
+                val = v1 * v2
+            else:
+                if v2 == 0:
+                    raise CompilerError(0, "Division by zero")
+                val = v1 // v2
+            return rewrite(quad, "=", str(val), None, res)
+        return quad
+    if op in {">", "<", "=="}:
+        if is_int_literal(a1) and is_int_literal(a2):
+            v1 = to_int(a1)
+            v2 = to_int(a2)
+            if op == ">":
+                val = 1 if v1 > v2 else 0
+            elif op == "<":
+                val = 1 if v1 < v2 else 0
+            else:
+                val = 1 if v1 == v2 else 0
+            return rewrite(quad, "=", str(val), None, res)
+        return quad
+    return quad
+
+
 def constant_fold(code):
-    new_code = []
+    return [fold_quad(quad) for quad in code]
+
+
+value_ops = {"=", "+", "-", "*", "/", ">", "<", "==", "PARAM", "jumpt"}
+
+
+def iter_propagated(code, known):
     for quad in code:
-        op, a1, a2, res = quad.op, quad.arg1, quad.arg2, quad.result
-        if op in {"+", "-", "*", "/"}:
-            if is_int_literal(a1) and is_int_literal(a2):
-                v1 = to_int(a1)
-                v2 = to_int(a2)
-                if op == "+":
-                    val = v1 + v2
-                elif op == "-":
-                    val = v1 - v2
-                elif op == "*":
-                    val = v1 * v2
-                else:
-                    if v2 == 0:
-                        raise CompilerError(0, "Division by zero")
-                    val = v1 // v2
-                new_code.append(type(quad)("=", str(val), None, res))
-            else:
-                new_code.append(quad)
+        op = quad.op
+        if op in {"label", "import"}:
+            known.clear()
+            yield quad
             continue
-        if op in {">", "<", "=="}:
-            if is_int_literal(a1) and is_int_literal(a2):
-                v1 = to_int(a1)
-                v2 = to_int(a2)
-                if op == ">":
-                    val = 1 if v1 > v2 else 0
-                elif op == "<":
-                    val = 1 if v1 < v2 else 0
+        if op in value_ops:
+            a1 = known.get(quad.arg1, quad.arg1)
+            a2 = known.get(quad.arg2, quad.arg2) if op != "jumpt" else quad.arg2
+            if (a1, a2) != (quad.arg1, quad.arg2):
+                if op == "/" and is_int_literal(a2) and to_int(a2) == 0:
+                    quad = rewrite(quad, "=", "0", None, quad.result)
                 else:
-                    val = 1 if v1 == v2 else 0
-                new_code.append(type(quad)("=", str(val), None, res))
-            else:
-                new_code.append(quad)
-            continue
-        new_code.append(quad)
-    return new_code
+                    quad = rewrite(quad, op, a1, a2, quad.result)
+            quad = fold_quad(quad)
+        if quad.op == "=" and is_int_literal(quad.arg1):
+            known[quad.result] = quad.arg1
+        elif quad.op == "loop":
+            known.pop(quad.arg1, None)
+        elif quad.result is not None:
+            known.pop(quad.result, None)
+        yield quad
+
+
+def propagate_constants(code):
+    return list(iter_propagated(code, {}))
+
+
+pure_ops = {"=", "+", "-", "*", "/", ">", "<", "=="}
 
 
 def dead_code_eliminate(code):
+    reads = set()
+    for quad in code:
+        reads.add(quad.arg1)
+        reads.add(quad.arg2)
     new_code = []
     for quad in code:
         op, a1, a2, res = quad.op, quad.arg1, quad.arg2, quad.result
@@ -65,13 +108,394 @@ def dead_code_eliminate(code):
             val = to_int(a1)
             if val == 0:
                 continue
-            new_code.append(type(quad)("jump", a2, None, None))
+            new_code.append(rewrite(quad, "jump", a2, None, None))
+            continue
+        if op in pure_ops and res not in reads and temp_pattern.fullmatch(res):
+            continue
+        new_code.append(quad)
+    return new_code
+
+
+def match_loop(code, index):
+    if index + 6 > len(code):
+        return None
+    init, start, test, branch, exit_jump, body_label = code[index:index + 6]
+    if init.op != "=" or init.arg1 != "0":
+        return None
+    counter = init.result
+    if start.op != "label" or test.op != "<" or test.arg1 != counter:
+        return None
+    if branch.op != "jumpt" or branch.arg1 != test.result or exit_jump.op != "jump":
+        return None
+    if body_label.op != "label" or branch.arg2 != body_label.arg1:
+        return None
+    end = index + 6
+    while end < len(code) and not (code[end].op == "label" and code[end].arg1 == exit_jump.arg1):
+        end += 1
+    if end == len(code) or end < index + 9:
+        return None
+    step, copy, back_jump = code[end - 3:end]
+    if step.op != "+" or step.arg1 != counter or step.arg2 != "1":
+        return None
+    if copy.op != "=" or copy.arg1 != step.result or copy.result != counter:
+        return None
+    if back_jump.op != "jump" or back_jump.arg1 != start.arg1:
+        return None
+    body = code[index + 6:end - 3]
+    times = test.arg2
+    for quad in body:
+        if quad.result in {times, counter} or counter in {quad.arg1, quad.arg2}:
+            return None
+    return counter, times, start.arg1, exit_jump.arg1, body, end
+
+
+def conditional_positions(body):
+    labels = {quad.arg1: index for index, quad in enumerate(body) if quad.op == "label"}
+    covered = set()
+    for index, quad in enumerate(body):
+        if quad.op in {"jump", "loop"}:
+            target = quad.arg1 if quad.op == "jump" else quad.arg2
+        elif quad.op == "jumpt":
+            target = quad.arg2
+        else:
+            continue
+        if target in labels:
+            lo, hi = sorted((index, labels[target]))
+            covered.update(range(lo + 1, hi))
+    return covered
+
+
+def induction_updates(body):
+    conditional = conditional_positions(body)
+    candidates = {}
+    for index in range(1, len(body)):
+        step, copy = body[index - 1], body[index]
+        if step.op not in {"+", "-"} or copy.op != "=" or copy.arg1 != step.result:
+            continue
+        if step.arg1 != copy.result or not is_int_literal(step.arg2):
+            continue
+        if index - 1 in conditional or index in conditional:
+            continue
+        delta = to_int(step.arg2) if step.op == "+" else -to_int(step.arg2)
+        candidates[copy.result] = (index - 1, delta)
+    updates = {}
+    for name, (first, delta) in candidates.items():
+        temp = body[first].result
+        reads = False
+        for index, quad in enumerate(body):
+            if index in {first, first + 1}:
+                continue
+            if quad.result in {name, temp} or temp in {quad.arg1, quad.arg2}:
+                break
+            if name in {quad.arg1, quad.arg2}:
+                reads = True
+        else:
+            updates[name] = (first, None if reads else delta)
+    return updates
+
+
+def coalesce_copy(step, copy):
+    return rewrite(step, step.op, step.arg1, step.arg2, copy.result)
+
+
+def reduce_loops(code):
+    new_code = []
+    index = 0
+    while index < len(code):
+        match = match_loop(code, index)
+        if match is None:
+            new_code.append(code[index])
+            index += 1
+            continue
+        counter, times, start, exit_label, body, end = match
+        body = reduce_loops(body)
+        updates = induction_updates(body)
+        closed = {}
+        if is_int_literal(times):
+            closed = {name: delta for name, (_, delta) in updates.items() if delta is not None}
+        steps = {first: name for name, (first, _) in updates.items()}
+        header = code[index]
+        new_code.append(rewrite(header, "=", times, None, counter))
+        new_code.append(rewrite(header, "label", start, None, None))
+        new_code.append(rewrite(header, "loop", counter, exit_label, None))
+        position = 0
+        while position < len(body):
+            name = steps.get(position)
+            if name is None:
+                new_code.append(body[position])
+                position += 1
+                continue
+            if name not in closed:
+                new_code.append(coalesce_copy(body[position], body[position + 1]))
+            position += 2
+        new_code.append(rewrite(header, "jump", start, None, None))
+        new_code.append(code[end])
+        trips = max(to_int(times), 0) if closed else 0
+        for name, delta in closed.items():
+            if delta * trips:
+                new_code.append(rewrite(header, "+", name, str(delta * trips), name))
+        index = end + 1
+    return new_code
+
+
+expression_ops = {"+", "-", "*", "/", ">", "<", "=="}
+commutative_ops = {"+", "*", "=="}
+
+
+def branch_target(quad):
+    if quad.op == "jump":
+        return quad.arg1
+    if quad.op in {"jumpt", "loop"}:
+        return quad.arg2
+    return None
+
+
+def label_predecessors(code):
+    counts = {}
+    for index, quad in enumerate(code):
+        target = branch_target(quad)
+        if target is not None:
+            counts[target] = counts.get(target, 0) + 1
+        if quad.op == "label" and (index == 0 or code[index - 1].op != "jump"):
+            counts[quad.arg1] = counts.get(quad.arg1, 0) + 1
+    return counts
+
+
+def basic_blocks(code):
+    if not code:
+        return [], {}, []
+    leaders = {0}
+    for index, quad in enumerate(code):
+        if quad.op == "label":
+            leaders.add(index)
+        if branch_target(quad) is not None:
+            leaders.add(index + 1)
+    starts = sorted(leader for leader in leaders if leader < len(code))
+    ends = starts[1:] + [len(code)]
+    labels = {code[start].arg1: block for block, start in enumerate(starts) if code[start].op == "label"}
+    successors = []
+    for block, end in enumerate(ends):
+        last = code[end - 1]
+        targets = [] if last.op == "jump" or end == len(code) else [block + 1]
+        if branch_target(last) in labels:
+            targets.append(labels[branch_target(last)])
+        successors.append(targets)
+    return list(zip(starts, ends)), labels, successors
+
+
+def immediate_dominators(successors):
+    order = []
+    seen = {0}
+    stack = [(0, iter(successors[0]))]
+    while stack:
+        block, children = stack[-1]
+        child = next(children, None)
+        if child is None:
+            order.append(block)
+            stack.pop()
+        elif child not in seen:
+            seen.add(child)
+            stack.append((child, iter(successors[child])))
+    order.reverse()
+    rank = {block: position for position, block in enumerate(order)}
+    predecessors = {block: [] for block in order}
+    for block in order:
+        for child in successors[block]:
+            predecessors[child].append(block)
+    idom = {0: 0}
+    changed = True
+    while changed:
+        changed = False
+        for block in order[1:]:
+            new = None
+            for pred in predecessors[block]:
+                if pred not in idom:
+                    continue
+                if new is None:
+                    new = pred
+                    continue
+                while new != pred:
+                    while rank[new] > rank[pred]:
+                        new = idom[new]
+                    while rank[pred] > rank[new]:
+                        pred = idom[pred]
+            if idom.get(block) != new:
+                idom[block] = new
+                changed = True
+    return idom
+
+
+def reachable(starts, edges, stops):
+    found = set()
+    stack = [block for block in starts if block not in stops]
+    while stack:
+        block = stack.pop()
+        if block in found:
             continue
+        found.add(block)
+        stack.extend(next_block for next_block in edges[block] if next_block not in stops)
+    return found
+
+
+def merge_points(code):
+    blocks, labels, successors = basic_blocks(code)
+    if not blocks:
+        return {}
+    idom = immediate_dominators(successors)
+    predecessors = [[] for _ in blocks]
+    for block, targets in enumerate(successors):
+        for target in targets:
+            predecessors[target].append(block)
+    merges = {}
+    for label, block in labels.items():
+        preds = predecessors[block]
+        dominator = idom.get(block)
+        if len(preds) < 2 or dominator is None or any(pred >= block for pred in preds):
+            continue
+        stops = {dominator, block}
+        arms = reachable(successors[dominator], successors, stops) & reachable(preds, predecessors, stops)
+        assigned = set()
+        for arm in arms:
+            start, end = blocks[arm]
+            for quad in code[start:end]:
+                if quad.op == "import":
+                    break
+                assigned.add(quad.arg1 if quad.op == "loop" else quad.result)
+            else:
+                continue
+            break
+        else:
+            merges[label] = (blocks[dominator][1] - 1, assigned)
+    return merges
+
+
+class ValueTable:
+
+    def __init__(self, numbers):
+        self.numbers = numbers
+        self.values = {}
+        self.expressions = {}
+
+    def copy(self):
+        table = ValueTable(self.numbers)
+        table.values = dict(self.values)
+        table.expressions = dict(self.expressions)
+        return table
+
+    def number(self, operand):
+        key = ("const", to_int(operand)) if is_int_literal(operand) else operand
+        if key not in self.values:
+            self.values[key] = next(self.numbers)
+        return self.values[key]
+
+    def assign(self, name, number=None):
+        self.values[name] = next(self.numbers) if number is None else number
+
+    def forget(self, names):
+        table = self.copy()
+        for name in names:
+            table.values.pop(name, None)
+        table.expressions = {key: holder for key, holder in table.expressions.items() if holder not in names}
+        return table
+
+    def expression(self, op, arg1, arg2):
+        left = self.number(arg1)
+        right = self.number(arg2)
+        if op in commutative_ops and right < left:
+            left, right = right, left
+        return op, left, right
+
+
+def number_values(code):
+    predecessors = label_predecessors(code)
+    merges = merge_points(code)
+    dominators = {position for position, _ in merges.values()}
+    numbers = itertools.count()
+    table = ValueTable(numbers)
+    snapshots = {}
+    exits = {}
+    aliases = {}
+    new_code = []
+    previous = None
+    for index, quad in enumerate(code):
+        if index - 1 in dominators:
+            exits[index - 1] = table.copy()
+        op, a1, a2, res = quad.op, quad.arg1, quad.arg2, quad.result
+        if op == "label":
+            if a1 in merges and merges[a1][0] in exits:
+                position, assigned = merges[a1]
+                table = exits[position].forget(assigned)
+            elif predecessors.get(a1, 0) != 1:
+                table = ValueTable(numbers)
+            elif a1 in snapshots:
+                table = snapshots[a1]
+            elif previous == "jump":
+                table = ValueTable(numbers)
+        elif op == "import":
+            table = ValueTable(numbers)
+        elif op in expression_ops:
+            a1 = aliases.get(a1, a1)
+            a2 = aliases.get(a2, a2)
+            key = table.expression(op, a1, a2)
+            holder = table.expressions.get(key)
+            if holder is not None and temp_pattern.fullmatch(res):
+                aliases[res] = holder
+                table.assign(res, table.number(holder))
+                previous = op
+                continue
+            if holder is not None:
+                quad = rewrite(quad, "=", holder, None, res)
+                table.assign(res, table.number(holder))
+            else:
+                quad = rewrite(quad, op, a1, a2, res)
+                table.assign(res)
+                if temp_pattern.fullmatch(res):
+                    table.expressions[key] = res
+        elif op == "=":
+            a1 = aliases.get(a1, a1)
+            quad = rewrite(quad, op, a1, a2, res)
+            table.assign(res, table.number(a1))
+        elif op in {"PARAM", "jumpt", "loop"}:
+            quad = rewrite(quad, op, aliases.get(a1, a1), a2, res)
+        target = branch_target(quad)
+        if target is not None:
+            snapshots[target] = table.copy()
+        if op == "loop":
+            table.assign(a1)
         new_code.append(quad)
+        previous = op
+    return new_code
+
+
+def fuse_calls(code):
+    new_code = []
+    index = 0
+    while index < len(code):
+        quad = code[index]
+        window = code[index:index + 3]
+        ops = [item.op for item in window]
+        if ops == ["PARAM", "PARAM", "CALL"] and window[2].arg1 == "play":
+            new_code.append(rewrite(window[2], "PLAY", quad.arg1, window[1].arg1, None))
+            index += 3
+        elif ops[:2] == ["PARAM", "CALL"] and window[1].arg1 == "rest":
+            new_code.append(rewrite(window[1], "REST", quad.arg1, None, None))
+            index += 2
+        else:
+            new_code.append(quad)
+            index += 1
     return new_code
 
 
 def optimize(code):
-    folded = constant_fold(code)
+    folded = propagate_constants(code)
     cleaned = dead_code_eliminate(folded)
-    return cleaned
+    reduced = reduce_loops(cleaned)
+    return fuse_calls(number_values(reduced))
+
+
+def optimize_stream(chunks):
+    known = {}
+    for chunk in chunks:
+        folded = list(iter_propagated(chunk, known))
+        cleaned = dead_code_eliminate(folded)
+        yield fuse_calls(number_values(reduce_loops(cleaned)))
@@ -1,7 +1,7 @@
 from src.ast_nodes import (
     AssignmentNode, BinOpNode, BlockNode, CompareNode, FunctionCallNode,
-    IdentifierNode, IfNode, NoteNode, NumberNode, ProgramNode, RepeatNode,
-    RestNode, VarDeclNode
+    IdentifierNode, IfNode, ImportNode, NoteNode, NumberNode, ProgramNode,
+    RepeatNode, RestNode, VarDeclNode
 )
 from src.errors import CompilerError
 from src.tokens import TokenType
@@ -24,15 +24,24 @@ type_tokens = {TokenType.INT_KW, TokenType.NOTE_KW, TokenType.STRING_KW}
 
 class Parser:
     def __init__(self, tokens):
-        self.tokens = tokens
-        self.index = 0
+        self.tokens = iter(tokens)
+        self.token = next(self.tokens)
+        self.lookahead = None
 
     def current(self):
-        return self.tokens[self.index]
+        return self.token
+
+    def peek(self):
+        if self.token.type == TokenType.EOF:
+            return None
+        if self.lookahead is None:
+            self.lookahead = next(self.tokens)
+        return self.lookahead
 
     def advance(self):
-        if self.index < len(self.tokens) - 1:
-            self.index += 1
+        if self.token.type != TokenType.EOF:
+            self.token = self.peek()
+            self.lookahead = None
         return self.current()
 
     def expect(self, token_type):
@@ -43,20 +52,36 @@ class Parser:
         return token
 
     def parse_program(self):
-        statements = []
+        return ProgramNode(list(self.iter_statements()))
+
+    def iter_statements(self):
         while self.current().type != TokenType.EOF:
-            statements.append(self.parse_statement())
-        return ProgramNode(statements)
+            if self.current().type == TokenType.IMPORT_KW:
+                yield self.parse_import()
+            else:
+                yield self.parse_statement()
+
+    def parse_import(self):
+        import_token = self.expect(TokenType.IMPORT_KW)
+        path_token = self.expect(TokenType.STRING_VAL)
+        self.expect(TokenType.SEMI)
+        node = ImportNode(path_token.value)
+        node.line = import_token.line
+        return node
 
     def parse_statement(self):
         token = self.current()
-        
+        node = self.parse_statement_node(token)
+        node.line = token.line
+        return node
+
+    def parse_statement_node(self, token):
         if token.type in type_tokens:
             return self.parse_declaration()
         
         if token.type == TokenType.ID:
-            next_type = self.tokens[self.index + 1].type if self.index + 1 < len(self.tokens) else None
-            if next_type == TokenType.ASSIGN:
+            next_token = self.peek()
+            if next_token is not None and next_token.type == TokenType.ASSIGN:
                 return self.parse_assignment()
         
         if token.type == TokenType.REPEAT_KW:
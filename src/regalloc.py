@@ -0,0 +1,167 @@
+import heapq
+
+from src.errors import CompilerError
+from src.icg import temp_pattern
+from src.optimizer import is_int_literal, to_int
+
+
+def is_temp(name):
+    return isinstance(name, str) and temp_pattern.fullmatch(name) is not None
+
+
+def uses_and_defs(quad):
+    op, a1, a2, res = quad.op, quad.arg1, quad.arg2, quad.result
+    if op in {"=", "+", "-", "*", "/", ">", "<", "=="}:
+        return [a1, a2], [res]
+    if op in {"PARAM", "jumpt", "REST"}:
+        return [a1], []
+    if op == "PLAY":
+        return [a1, a2], []
+    if op == "loop":
+        return [a1], [a1]
+    return [], []
+
+
+def successors(code, labels):
+    succ = []
+    for index, quad in enumerate(code):
+        if quad.op == "jump":
+            succ.append([labels[quad.arg1]])
+        elif quad.op == "jumpt":
+            succ.append([index + 1, labels[quad.arg2]])
+        elif quad.op == "loop":
+            succ.append([index + 1, labels[quad.arg2]])
+        else:
+            succ.append([index + 1])
+    return succ
+
+
+def liveness(code):
+    labels = {quad.arg1: index for index, quad in enumerate(code) if quad.op == "label"}
+    succ = successors(code, labels)
+    uses = []
+    defs = []
+    for quad in code:
+        used, defined = uses_and_defs(quad)
+        uses.append({name for name in used if is_temp(name)})
+        defs.append({name for name in defined if is_temp(name)})
+    live_in = [set() for _ in code]
+    changed = True
+    while changed:
+        changed = False
+        for index in range(len(code) - 1, -1, -1):
+            live_out = set()
+            for target in succ[index]:
+                if target < len(code):
+                    live_out |= live_in[target]
+            new_in = uses[index] | (live_out - defs[index])
+            if new_in != live_in[index]:
+                live_in[index] = new_in
+                changed = True
+    return live_in, defs
+
+
+def live_intervals(code):
+    live_in, defs = liveness(code)
+    if live_in and live_in[0]:
+        name = min(live_in[0])
+        raise CompilerError(0, f"Temporary {name} is read before it is defined in this block of code")
+    intervals = {}
+    for index in range(len(code)):
+        for name in live_in[index] | defs[index]:
+            start, end = intervals.get(name, (index, index))
+            intervals[name] = (min(start, index), max(end, index))
+    return intervals
+
+
+class SlotAllocator:
+
+    def __init__(self, track_lines=False):
+        self.slot_count = 0
+        self.variables = {}
+        self.constants = {}
+        self.temp_slots = []
+        self.pc = 0
+        self.track_lines = track_lines
+        self.lines = []
+        self.labels = []
+
+    def new_slot(self):
+        self.slot_count += 1
+        return self.slot_count - 1
+
+    def constant(self, value):
+        value = to_int(value)
+        if value not in self.constants:
+            self.constants[value] = self.new_slot()
+        return self.constants[value]
+
+    def variable(self, name):
+        if name not in self.variables:
+            self.variables[name] = self.new_slot()
+        return self.variables[name]
+
+    def assign_temps(self, code):
+        intervals = sorted(live_intervals(code).items(), key=lambda item: item[1])
+        free = list(self.temp_slots)
+        heapq.heapify(free)
+        active = []
+        slots = {}
+        for name, (start, end) in intervals:
+            while active and active[0][0] < start:
+                heapq.heappush(free, heapq.heappop(active)[1])
+            if free:
+                slot = heapq.heappop(free)
+            else:
+                slot = self.new_slot()
+                self.temp_slots.append(slot)
+            slots[name] = slot
+            heapq.heappush(active, (end, slot))
+        return slots
+
+    def operand(self, name, temps):
+        if name is None:
+            return None
+        if is_int_literal(name):
+            return self.constant(name)
+        if name in temps:
+            return temps[name]
+        return self.variable(name)
+
+    def lower(self, code):
+        temps = self.assign_temps(code)
+        targets = {}
+        instructions = []
+        pc = self.pc
+        for quad in code:
+            if quad.op == "label":
+                targets[quad.arg1] = pc
+                if self.track_lines:
+                    self.labels.append((pc, quad.arg1))
+            else:
+                pc += 1
+        for quad in code:
+            op, a1, a2, res = quad.op, quad.arg1, quad.arg2, quad.result
+            if op == "label":
+                continue
+            if op == "jump":
+                instruction = (op, targets[a1], None, None)
+            elif op in {"jumpt", "loop"}:
+                instruction = (op, self.operand(a1, temps), targets[a2], None)
+            elif op == "CALL":
+                instruction = (op, a1, to_int(a2), None)
+            else:
+                instruction = (op, self.operand(a1, temps), self.operand(a2, temps), self.operand(res, temps))
+            instructions.append(instruction)
+            if self.track_lines:
+                self.lines.append(quad.line)
+        self.pc += len(instructions)
+        return instructions
+
+    def constant_table(self):
+        return sorted((slot, value) for value, slot in self.constants.items())
+
+
+def allocate_slots(code, track_lines=False):
+    allocator = SlotAllocator(track_lines)
+    return allocator, allocator.lower(code)
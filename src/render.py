@@ -0,0 +1,176 @@
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from src.events import run_events
+
+
+SAMPLE_RATE = 44100
+AMPLITUDE = 4096
+CHUNKS_PER_WORKER = 4
+
+
+@dataclass
+class Timeline:
+    starts: np.ndarray
+    lengths: np.ndarray
+    freqs: np.ndarray
+    steps: np.ndarray
+    total: int
+    segments: list = field(default_factory=list)
+
+
+def sample_at(ms):
+    return ms * SAMPLE_RATE // 1000
+
+
+def build_timeline(events, count=None):
+    if count is None:
+        events = list(events)
+        count = len(events)
+    starts = np.empty(count, dtype=np.int64)
+    lengths = np.empty(count, dtype=np.int64)
+    freqs = np.empty(count, dtype=np.float64)
+    steps = np.empty(count, dtype=np.float64)
+    segments = []
+    segment = []
+    segment_ms = 0
+    segment_note = 0
+    previous_line = 0
+    elapsed_ms = 0
+    index = 0
+    for event in events:
+        if segment and event.line <= previous_line:
+            key = (segment_ms * SAMPLE_RATE % 1000, tuple(segment))
+            segments.append((segment_note, index, segment_ms, elapsed_ms, key))
+            segment, segment_ms, segment_note = [], elapsed_ms, index
+        segment.append((event.freq, event.duration, event.rest))
+        previous_line = event.line
+        duration = max(event.duration, 0)
+        n_samples = int(SAMPLE_RATE * (duration / 1000.0))
+        if event.freq > 0 and n_samples > 0:
+            starts[index] = sample_at(elapsed_ms)
+            lengths[index] = n_samples
+            freqs[index] = event.freq
+            steps[index] = (duration / 1000.0) / n_samples
+            index += 1
+        elapsed_ms += duration
+    if segment:
+        key = (segment_ms * SAMPLE_RATE % 1000, tuple(segment))
+        segments.append((segment_note, index, segment_ms, elapsed_ms, key))
+    total = sample_at(elapsed_ms)
+    if index:
+        total = max(total, int(starts[index - 1] + lengths[index - 1]))
+    return Timeline(starts[:index], lengths[:index], freqs[:index], steps[:index], total, segments)
+
+
+def deduplicate(timeline):
+    keep = np.ones(len(timeline.starts), dtype=bool)
+    rendered = {}
+    copies = []
+    for first, last, start_ms, end_ms, key in timeline.segments:
+        lo = sample_at(start_ms)
+        hi = sample_at(end_ms)
+        if hi <= lo or first == last:
+            continue
+        source = rendered.setdefault(key, lo)
+        if source != lo:
+            keep[first:last] = False
+            copies.append((source, lo, hi - lo))
+    unique = Timeline(
+        timeline.starts[keep], timeline.lengths[keep], timeline.freqs[keep], timeline.steps[keep], timeline.total
+    )
+    return unique, copies
+
+
+def synthesize(out, lo, hi, starts, lengths, freqs, steps):
+    for start, length, freq, step in zip(starts, lengths, freqs, steps):
+        a = max(lo, start)
+        b = min(hi, start + length)
+        if a >= b:
+            continue
+        t = np.arange(a - start, b - start) * step
+        wave_data = np.sin(2 * np.pi * freq * t) * AMPLITUDE
+        out[a - lo:b - lo] += wave_data.astype(np.int16)
+
+
+def window_notes(timeline, ends, lo, hi):
+    first = np.searchsorted(ends, lo, side="right")
+    last = np.searchsorted(timeline.starts, hi, side="left")
+    return (
+        timeline.starts[first:last],
+        timeline.lengths[first:last],
+        timeline.freqs[first:last],
+        timeline.steps[first:last],
+    )
+
+
+def render_window(shm_name, total, lo, hi, notes):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        out = np.ndarray((total,), dtype=np.int16, buffer=shm.buf)
+        synthesize(out[lo:hi], lo, hi, *notes)
+        del out
+    finally:
+        shm.close()
+    return hi - lo
+
+
+def chunk_bounds(total, chunks):
+    size = max(1, -(-total // max(chunks, 1)))
+    return [(lo, min(lo + size, total)) for lo in range(0, total, size)]
+
+
+def render(timeline, workers=1, memoize=True):
+    copies = []
+    if memoize:
+        timeline, copies = deduplicate(timeline)
+    out = render_notes(timeline, workers)
+    for source, target, length in copies:
+        out[target:target + length] = out[source:source + length]
+    return out
+
+
+def render_notes(timeline, workers=1):
+    if workers <= 1 or timeline.total == 0:
+        out = np.zeros(timeline.total, dtype=np.int16)
+        synthesize(out, 0, timeline.total, timeline.starts, timeline.lengths, timeline.freqs, timeline.steps)
+        return out
+    shm = shared_memory.SharedMemory(create=True, size=timeline.total * 2)
+    try:
+        out = np.ndarray((timeline.total,), dtype=np.int16, buffer=shm.buf)
+        out[:] = 0
+        ends = np.maximum.accumulate(timeline.starts + timeline.lengths)
+        bounds = chunk_bounds(timeline.total, workers * CHUNKS_PER_WORKER)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            jobs = [
+                pool.submit(render_window, shm.name, timeline.total, lo, hi, window_notes(timeline, ends, lo, hi))
+                for lo, hi in bounds
+            ]
+            for job in jobs:
+                job.result()
+        result = out.copy()
+        del out
+    finally:
+        shm.close()
+        shm.unlink()
+    return result
+
+
+def write_wav(samples, output_path):
+    stereo = np.repeat(samples, 2)
+    with wave.open(str(output_path), "wb") as wav_file:
+        wav_file.setnchannels(2)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(SAMPLE_RATE)
+        wav_file.writeframes(stereo.astype("<i2").tobytes())
+    return output_path
+
+
+def generate_wav(code, output_path="output.wav", workers=1, sounds=None, max_steps=None, budget=None,
+                 max_audio_ms=None):
+    timeline = build_timeline(run_events(code, max_steps, budget, max_audio_ms), sounds)
+    return write_wav(render(timeline, workers), output_path)
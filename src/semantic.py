@@ -1,6 +1,6 @@
 from src.ast_nodes import (
     AssignmentNode, BinOpNode, BlockNode, CompareNode, FunctionCallNode,
-    IdentifierNode, IfNode, NoteNode, NumberNode, ProgramNode,
+    IdentifierNode, IfNode, ImportNode, NoteNode, NumberNode, ProgramNode,
     RepeatNode, RestNode, VarDeclNode
 )
 from src.errors import CompilerError
@@ -10,43 +10,58 @@ from src.tokens import TokenType
 class SymbolTable:
     
     def __init__(self):
-        self.scopes = [{}] 
+        self.symbols = {}
+        self.undo_log = [[]]
     
     def push_scope(self):
-        self.scopes.append({})
+        self.undo_log.append([])
     
     def pop_scope(self):
-        if len(self.scopes) > 1:
-            self.scopes.pop()
+        if len(self.undo_log) > 1:
+            for name in self.undo_log.pop():
+                chain = self.symbols[name]
+                chain.pop()
+                if not chain:
+                    del self.symbols[name]
     
     def declare(self, name, type_name):
-        current_scope = self.scopes[-1]
-        if name in current_scope:
+        depth = len(self.undo_log) - 1
+        chain = self.symbols.setdefault(name, [])
+        if chain and chain[-1][0] == depth:
             raise CompilerError(0, f"Variable '{name}' already declared in this scope")
-        current_scope[name] = type_name
+        chain.append((depth, type_name))
+        self.undo_log[-1].append(name)
     
     def lookup(self, name):
-        for scope in reversed(self.scopes):
-            if name in scope:
-                return scope[name]
-        raise CompilerError(0, f"Variable '{name}' not declared")
+        chain = self.symbols.get(name)
+        if not chain:
+            raise CompilerError(0, f"Variable '{name}' not declared")
+        return chain[-1][1]
     
     def is_declared(self, name):
-        for scope in reversed(self.scopes):
-            if name in scope:
-                return True
-        return False
+        return name in self.symbols
+    
+    def global_names(self):
+        return {name: chain[0][1] for name, chain in self.symbols.items() if chain[0][0] == 0}
 
 
 class SemanticAnalyzer:
     
-    def __init__(self):
+    def __init__(self, imports=None):
         self.symbol_table = SymbolTable()
+        self.imports = imports or {}
+        self.imported = {}
     
     def analyze(self, program):
         self.visit(program)
         return program
     
+    def exports(self, origin):
+        return {
+            name: (type_name, self.imported.get(name, origin))
+            for name, type_name in self.symbol_table.global_names().items()
+        }
+    
     def visit(self, node):
         method_name = f"visit_{node.__class__.__name__}"
         method = getattr(self, method_name, None)
@@ -58,6 +73,15 @@ class SemanticAnalyzer:
         for statement in node.statements:
             self.visit(statement)
     
+    def visit_ImportNode(self, node):
+        if node.path not in self.imports:
+            raise CompilerError(0, f"Module '{node.path}' not found")
+        for name, (type_name, origin) in self.imports[node.path].items():
+            if self.imported.get(name) == origin:
+                continue
+            self.symbol_table.declare(name, type_name)
+            self.imported[name] = origin
+    
     def visit_VarDeclNode(self, node):
         type_map = {
             TokenType.INT_KW: "int",
@@ -77,9 +101,6 @@ class SemanticAnalyzer:
         self.symbol_table.declare(node.name, type_name)
     
     def visit_AssignmentNode(self, node):
-        if not self.symbol_table.is_declared(node.name):
-            raise CompilerError(0, f"Variable '{node.name}' not declared")
-        
         var_type = self.symbol_table.lookup(node.name)
         expr_type = self.visit(node.value)
         
@@ -93,8 +114,6 @@ class SemanticAnalyzer:
         return "note"
     
     def visit_IdentifierNode(self, node):
-        if not self.symbol_table.is_declared(node.name):
-            raise CompilerError(0, f"Variable '{node.name}' not declared")
         return self.symbol_table.lookup(node.name)
     
     def visit_BinOpNode(self, node):
@@ -11,9 +11,11 @@ class TokenType(Enum):
     ELSE_KW = auto()
     PLAY_KW = auto()
     REST_KW = auto()
+    IMPORT_KW = auto()
     ID = auto()
     NUM = auto()
     NOTE_VAL = auto()
+    STRING_VAL = auto()
     ASSIGN = auto()
     PLUS = auto()
     MINUS = auto()
@@ -0,0 +1,73 @@
+from src.ast_nodes import BlockNode, IfNode, NumberNode, ProgramNode, RepeatNode
+
+
+DEFAULT_BUDGET = 64
+
+
+def statement_size(node):
+    if isinstance(node, RepeatNode):
+        return 1 + block_size(node.block)
+    if isinstance(node, IfNode):
+        return 1 + block_size(node.then_block) + block_size(node.else_block)
+    return 1
+
+
+def block_size(block):
+    if block is None:
+        return 0
+    return sum(statement_size(statement) for statement in block.statements)
+
+
+def with_line(node, source):
+    node.line = source.line
+    return node
+
+
+def unroll_statements(statements, budget):
+    result = []
+    for statement in statements:
+        result.extend(unroll_statement(statement, budget))
+    return result
+
+
+def unroll_block(block, budget):
+    if block is None:
+        return None
+    return BlockNode(unroll_statements(block.statements, budget))
+
+
+def unroll_statement(node, budget):
+    if isinstance(node, IfNode):
+        then_block = unroll_block(node.then_block, budget)
+        else_block = unroll_block(node.else_block, budget)
+        return [with_line(IfNode(node.condition, then_block, else_block), node)]
+    if not isinstance(node, RepeatNode):
+        return [node]
+    body = unroll_block(node.block, budget)
+    if not isinstance(node.times, NumberNode):
+        return [with_line(RepeatNode(node.times, body), node)]
+    count = node.times.value
+    if count <= 0:
+        return []
+    size = max(block_size(body), 1)
+    if count * size <= budget:
+        return body.statements * count
+    factor = budget // size
+    if factor < 2:
+        return [with_line(RepeatNode(node.times, body), node)]
+    trips, remainder = divmod(count, factor)
+    result = [with_line(RepeatNode(NumberNode(trips), BlockNode(body.statements * factor)), node)]
+    result.extend(body.statements * remainder)
+    return result
+
+
+def unroll_top_level(statement, budget=DEFAULT_BUDGET):
+    if budget <= 0:
+        return [statement]
+    return unroll_statement(statement, budget)
+
+
+def unroll_loops(program, budget=DEFAULT_BUDGET):
+    if budget <= 0:
+        return program
+    return ProgramNode(unroll_statements(program.statements, budget))